@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_environment(django_test_environment):
+    """Те же настройки, что у TEST_RUNNER в manage.py test."""
+    from core.testing import test_environment
+    with test_environment():
+        yield
@@ -0,0 +1,108 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import NEXT, encode_position
+
+User = get_user_model()
+
+
+@override_settings(COUNT_PAGES=2)
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth',
+                                              first_name='Лев')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(text=f'пост {i}', author=cls.author,
+                                group=cls.group)
+            for i in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feeds_paginate_by_cursor(self):
+        urls = [
+            reverse('api:posts'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:profile_posts',
+                    kwargs={'username': self.author.username}),
+            reverse('api:follow_posts'),
+        ]
+        expected = [post.id for post in reversed(self.posts)]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).json()
+                second = self.authorized_client.get(
+                    url, {'cursor': first['next']}
+                ).json()
+                ids = [post['id'] for post in
+                       first['results'] + second['results']]
+                self.assertEqual(ids, expected)
+                self.assertIsNone(first['previous'])
+                self.assertIsNone(second['next'])
+
+    def test_fields_selection(self):
+        response = self.guest_client.get(reverse('api:posts'),
+                                         {'fields': 'id,author_name'})
+        self.assertEqual(response.json()['results'][0],
+                         {'id': self.posts[-1].id, 'author_name': 'Лев'})
+        response = self.guest_client.get(reverse('api:posts'),
+                                         {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_etag_not_modified(self):
+        url = reverse('api:post_detail',
+                      kwargs={'post_id': self.posts[0].id})
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+        # Поколения берутся из кэша, остаётся только поиск автора поста.
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        post = Post.objects.get(id=self.posts[0].id)
+        post.text = 'новый'
+        post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['text'], 'новый')
+
+    def test_feed_etag_follows_comments(self):
+        url = reverse('api:posts')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(post=self.posts[-1], author=self.reader,
+                               text='первый')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['comments_count'], 1)
+
+    def test_errors(self):
+        responses = {
+            reverse('api:follow_posts'): HTTPStatus.UNAUTHORIZED,
+            reverse('api:post_detail', kwargs={'post_id': 0}):
+                HTTPStatus.NOT_FOUND,
+            reverse('api:posts') + '?cursor=broken': HTTPStatus.BAD_REQUEST,
+            reverse('api:posts') + '?cursor=' + encode_position(
+                NEXT, timezone.now(), 10 ** 30
+            ): HTTPStatus.BAD_REQUEST,
+        }
+        for url, status in responses.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', response.json())
@@ -0,0 +1,193 @@
+import json
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition, require_safe
+
+from posts.cache import (COMMENTS_GENERATION_KEY, generations_etag,
+                         get_generations, object_generation_key)
+from posts.models import Group, Post, User
+from posts.paginators import (NEXT, PREVIOUS, CursorPaginator, FeedPaginator,
+                              InvalidCursor, decode_cursor, encode_cursor)
+from posts.views import (group_show_tags, index_tags, post_detail_tags,
+                         profile_tags)
+
+FIELDS = {
+    'id': lambda request, post: post.id,
+    'text': lambda request, post: post.text,
+    'pub_date': lambda request, post: post.pub_date,
+    'author': lambda request, post: post.author.username,
+    'author_name': lambda request, post: post.author.get_full_name(),
+    'group': lambda request, post: post.group.slug if post.group else None,
+    'image': lambda request, post: (
+        request.build_absolute_uri(post.image.url) if post.image else None
+    ),
+    'comments_count': lambda request, post: post.comments_count,
+    'url': lambda request, post: reverse(
+        'posts:post_detail', kwargs={'post_id': post.id}
+    ),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def json_response(request, data, status=200):
+    body = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return HttpResponse(
+        body.encode(), status=status, content_type='application/json'
+    )
+
+
+def error_response(request, error):
+    return json_response(request, {'detail': error.detail}, error.status)
+
+
+def api_etag(tags_func, request, *args, **kwargs):
+    # В отличие от HTML-страниц, ответ API не зависит от того, кто его
+    # запросил: лента подписок различается по поколению автора-читателя.
+    tags = tags_func(request, *args, **kwargs)
+    if tags is None:
+        return None
+    return generations_etag([request.GET.urlencode()], get_generations(tags))
+
+
+def api_view(tags_func):
+    """Только GET/HEAD, ошибки отдаются в JSON.
+
+    ETag строится по поколениям из tags_func так же, как у страниц
+    posts.utils.cached_page, поэтому 304 отдаётся до запроса постов и
+    сериализации. tags_func возвращает None, если ETag не нужен.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=partial(api_etag, tags_func)
+        )(view)
+
+        @require_safe
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                response = conditional_view(request, *args, **kwargs)
+            except Http404:
+                response = error_response(
+                    request, ApiError(404, 'Не найдено.')
+                )
+            except ApiError as exc:
+                response = error_response(request, exc)
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def with_comments(tags_func):
+    """Поколения ленты API: как у её HTML-страницы и комментарии.
+
+    В ленте API у каждого поста есть comments_count, которого нет
+    в карточках HTML-лент.
+    """
+    def tags(request, *args, **kwargs):
+        tags = tags_func(request, *args, **kwargs)
+        if tags is None:
+            return None
+        return tags + [COMMENTS_GENERATION_KEY]
+    return tags
+
+
+def follow_tags(request):
+    # Подписки и отписки меняют поколение автора у подписчика, новые
+    # посты — поколение главной.
+    if not request.user.is_authenticated:
+        return None
+    return with_comments(index_tags)(request) + [
+        object_generation_key('author', request.user.pk)
+    ]
+
+
+def get_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(FIELDS)
+    fields = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ApiError(400, 'Неизвестные поля: ' + ', '.join(unknown))
+    return fields
+
+
+def serialize_post(request, post, fields):
+    return {field: FIELDS[field](request, post) for field in fields}
+
+
+def feed_response(request, queryset, paginator_class=CursorPaginator):
+    fields = get_fields(request)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor:
+            raise ApiError(400, 'Некорректный курсор.')
+    paginator = paginator_class(queryset, settings.COUNT_PAGES)
+    page = paginator.get_cursor_page(cursor)
+    posts = list(page)
+    next_cursor = previous_cursor = None
+    if posts and page.has_next():
+        next_cursor = encode_cursor(posts[-1], NEXT)
+    if posts and page.has_previous():
+        previous_cursor = encode_cursor(posts[0], PREVIOUS)
+    return json_response(request, {
+        'results': [serialize_post(request, post, fields) for post in posts],
+        'next': next_cursor,
+        'previous': previous_cursor,
+    })
+
+
+def posts_queryset():
+    return Post.objects.select_related('author', 'group')
+
+
+@api_view(with_comments(index_tags))
+def index(request):
+    return feed_response(request, posts_queryset())
+
+
+@api_view(with_comments(group_show_tags))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, posts_queryset().filter(group=group))
+
+
+@api_view(with_comments(profile_tags))
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, posts_queryset().filter(author=author))
+
+
+@api_view(follow_tags)
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна авторизация.')
+    response = feed_response(
+        request, request.user.feed_entries.all(), FeedPaginator
+    )
+    patch_cache_control(response, private=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+@api_view(post_detail_tags)
+def post_detail(request, post_id):
+    post = get_object_or_404(posts_queryset(), id=post_id)
+    return json_response(
+        request, serialize_post(request, post, get_fields(request))
+    )
@@ -0,0 +1,289 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# SQLite ограничивает число параметров в одном запросе.
+MAX_PARAMS = 900
+# Время последнего чтения обновляется не чаще, чем раз в столько секунд:
+# иначе каждое попадание в кэш было бы записью в файл.
+ACCESS_RESOLUTION = 1
+
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL,
+        size INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    """
+    CREATE TABLE IF NOT EXISTS cache_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        entries INTEGER NOT NULL,
+        bytes INTEGER NOT NULL
+    )
+    """,
+    'INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0)',
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+        UPDATE cache_stats
+        SET entries = entries + 1, bytes = bytes + new.size;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+        UPDATE cache_stats
+        SET entries = entries - 1, bytes = bytes - old.size;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+    BEGIN
+        UPDATE cache_stats SET bytes = bytes + new.size - old.size;
+    END
+    """,
+]
+
+UPSERT_SQL = """
+    INSERT INTO cache (key, value, expires, accessed, size)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (key) DO UPDATE SET
+        value = excluded.value, expires = excluded.expires,
+        accessed = excluded.accessed, size = excluded.size
+"""
+ADD_SQL = UPSERT_SQL + ' WHERE cache.expires <= excluded.accessed'
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+def encode(value):
+    # Целые числа хранятся как есть, чтобы incr() работал одним UPDATE.
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(value):
+    if isinstance(value, bytes):
+        return pickle.loads(value)
+    return value
+
+
+def value_size(value):
+    return len(value) if isinstance(value, bytes) else 8
+
+
+def chunks(items, size=MAX_PARAMS):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов одного сервера.
+
+    LOCATION — путь к файлу базы. Кроме MAX_ENTRIES и CULL_FREQUENCY
+    понимает OPTIONS['MAX_BYTES'] — предел суммарного размера значений.
+    При переполнении сначала удаляются просроченные записи, затем
+    давно не читавшиеся (LRU). incr() атомарен между процессами.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._max_bytes = int(options.get('MAX_BYTES', 0)) or None
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # Соединение своё у каждого потока и каждого процесса: после fork
+        # унаследованным соединением пользоваться нельзя.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            self._local.connection = self._connect()
+            self._local.pid = pid
+        return self._local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path, timeout=30, isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        with self._write(connection):
+            for sql in SCHEMA_SQL:
+                connection.execute(sql)
+        return connection
+
+    @contextmanager
+    def _write(self, connection=None):
+        """Транзакция, которая сразу берёт блокировку на запись."""
+        connection = connection or self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, value, timeout, now):
+        value = encode(value)
+        return (
+            key, value, self.get_backend_timeout(timeout), now,
+            value_size(value),
+        )
+
+    def _fetch(self, keys):
+        """{ключ: (значение, время чтения)} для живых записей."""
+        now = time.time()
+        found = {}
+        for chunk in chunks(keys):
+            placeholders = ', '.join('?' * len(chunk))
+            found.update(
+                (key, (value, accessed))
+                for key, value, accessed in self._connection.execute(
+                    f'SELECT key, value, accessed FROM cache '
+                    f'WHERE key IN ({placeholders}) AND {ALIVE}',
+                    [*chunk, now],
+                )
+            )
+        stale = [
+            key for key, (_, accessed) in found.items()
+            if accessed < now - ACCESS_RESOLUTION
+        ]
+        if stale:
+            with self._write() as connection:
+                connection.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?',
+                    [(now, key) for key in stale],
+                )
+        return {key: decode(value) for key, (value, _) in found.items()}
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._fetch(keys)
+        return {keys[key]: value for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ]
+        with self._write() as connection:
+            connection.executemany(UPSERT_SQL, rows)
+            self._cull(connection, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        row = self._row(self._key(key, version), value, timeout, now)
+        with self._write() as connection:
+            added = connection.execute(ADD_SQL, row).rowcount == 1
+            if added:
+                self._cull(connection, now)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            return connection.execute(
+                f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._write() as connection:
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {ALIVE}',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = decode(row[0]) + delta
+            encoded = encode(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (encoded, value_size(encoded), key),
+            )
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._write() as connection:
+            for chunk in chunks(keys):
+                placeholders = ', '.join('?' * len(chunk))
+                connection.execute(
+                    f'DELETE FROM cache WHERE key IN ({placeholders})', chunk
+                )
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        if not self._over_limit(entries, size):
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        entries, size = connection.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        while entries and self._over_limit(entries, size):
+            # Как и LocMemCache, удаляем сразу долю записей, чтобы не
+            # чистить кэш на каждой записи; CULL_FREQUENCY = 0 — все.
+            count = entries
+            if self._cull_frequency:
+                count = max(entries // self._cull_frequency, 1)
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (count,),
+            )
+            entries, size = connection.execute(
+                'SELECT entries, bytes FROM cache_stats'
+            ).fetchone()
+
+    def _over_limit(self, entries, size):
+        if entries > self._max_entries:
+            return True
+        return self._max_bytes is not None and size > self._max_bytes
@@ -0,0 +1,82 @@
+import math
+import random
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+
+LOCK_KEY = '{}:lock'
+WAIT_INTERVAL = 0.05
+
+# value — закэшированное значение, delta — сколько секунд оно считалось,
+# expires — когда оно устаревает (None — никогда).
+Entry = namedtuple('Entry', 'value delta expires')
+
+
+def is_fresh(entry, beta):
+    """Не пора ли пересчитать значение заранее (XFetch).
+
+    Чем ближе срок и чем дольше считается значение, тем вероятнее
+    пересчёт, поэтому к моменту истечения его обычно уже обновил один
+    из запросов, а не все сразу.
+    """
+    if entry.expires is None:
+        return True
+    early = entry.delta * beta * -math.log(1 - random.random())
+    return time.time() + early < entry.expires
+
+
+def recompute(cache, key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    expires = None if timeout is None else time.time() + timeout
+    # Запись живёт дольше своего срока: пока один запрос пересчитывает
+    # значение, остальные отдают устаревшее.
+    physical = None if timeout is None else (
+        timeout + settings.CACHE_STALE_TIMEOUT
+    )
+    cache.set(key, Entry(value, delta, expires), physical)
+    return value
+
+
+def wait_for(cache, key, lock_timeout):
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if isinstance(entry, Entry):
+            return entry
+    return None
+
+
+def get_or_compute(key, compute, timeout, cache=None, beta=1):
+    """Значение из кэша; пересчитывает его только один запрос.
+
+    Значение пересчитывается заранее с вероятностью, растущей к концу
+    timeout (beta > 1 — раньше, beta < 1 — позже). Пересчитывает тот,
+    кто взял блокировку cache.add(); остальные тем временем получают
+    устаревшее значение, а если его нет — ждут результат не дольше
+    CACHE_LOCK_TIMEOUT секунд и только потом считают сами.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if not isinstance(entry, Entry):
+        entry = None
+    if entry is not None and is_fresh(entry, beta):
+        return entry.value
+    lock_key = LOCK_KEY.format(key)
+    lock_timeout = settings.CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, True, lock_timeout):
+        try:
+            return recompute(cache, key, compute, timeout)
+        finally:
+            # Блокировка снимается записью с нулевым сроком, а не delete():
+            # delete() в TieredCache сбрасывает L1 во всех процессах.
+            cache.set(lock_key, None, 0)
+    if entry is None:
+        entry = wait_for(cache, key, lock_timeout)
+    if entry is not None:
+        return entry.value
+    return compute()
@@ -0,0 +1,268 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import request_started
+from django.http import HttpResponse
+
+EPOCH_KEY = 'core:l1:epoch'
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _new_epoch():
+    return int(time.time() * 1000)
+
+
+class L1Store:
+    """LRU ближнего уровня, общий для всех потоков процесса."""
+
+    def __init__(self):
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.epoch = None
+        self.checked = False
+        self.request = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is None:
+                return None
+            expires, request = entry[:2]
+            stale = request is not None and request != self.request
+            if expires <= time.monotonic() or stale:
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return entry
+
+    def put(self, key, entry, max_entries):
+        with self.lock:
+            self.data[key] = entry
+            self.data.move_to_end(key)
+            while len(self.data) > max_entries:
+                self.data.popitem(last=False)
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+def get_store(name):
+    with _stores_lock:
+        return _stores.setdefault(name, L1Store())
+
+
+def forget_epochs(**kwargs):
+    # Каждый запрос один раз сверяет эпоху с L2 и заново читает счётчики:
+    # так запрос, начатый после записи в другом процессе, не увидит
+    # устаревший L1.
+    for store in list(_stores.values()):
+        store.checked = False
+        store.request += 1
+
+
+request_started.connect(forget_epochs)
+
+
+def copy_response(response):
+    # Заголовки и тело у копии свои, остальное общее: конструктор
+    # HttpResponse на каждое чтение в разы медленнее распаковки.
+    # Атрибуты заголовков — Django из requirements.txt, проверяет
+    # TieredCacheTests.test_responses_copied.
+    copied = copy.copy(response)
+    copied._headers = response._headers.copy()
+    copied._container = list(response._container)
+    if response.cookies:
+        copied.cookies = copy.deepcopy(response.cookies)
+    return copied
+
+
+def has_response(value):
+    if isinstance(value, HttpResponse):
+        return True
+    return type(value) is tuple and any(has_response(item) for item in value)
+
+
+def detach(value):
+    """Копия HttpResponse в значении, в том числе внутри кортежа.
+
+    Объекты в L1 общие для всех потоков и не распаковываются на каждое
+    чтение, поэтому менять их нельзя. Исключение — HttpResponse: его
+    дописывают view и middleware уже после записи в кэш, так что ответ
+    копируется и при записи, и при чтении.
+    """
+    if isinstance(value, HttpResponse):
+        return copy_response(value)
+    if type(value) is tuple:
+        return tuple(detach(item) for item in value)
+    return value
+
+
+def is_counter(value):
+    # incr() в другом процессе может поменять любое целое число.
+    return isinstance(value, int)
+
+
+class TieredCache(BaseCache):
+    """Маленький LRU в памяти процесса перед общим кэшем.
+
+    LOCATION — имя кэша второго уровня в CACHES. Значения живут в L1 не
+    дольше OPTIONS['L1_TIMEOUT'] секунд, в L1 помещается не больше
+    OPTIONS['L1_MAX_ENTRIES'] записей. Запись проходит в L2 сразу.
+    Из L1 значения отдаются без распаковки, теми же объектами, см.
+    detach().
+
+    Целые числа — счётчики, которые меняет incr(), например поколения
+    posts.cache, — живут в L1 только до конца запроса, и каждый запрос
+    читает их из L2 заново. Остальные ключи построены на поколениях и
+    при их смене просто перестают запрашиваться, поэтому смена
+    поколения не сбрасывает L1 ни в одном процессе. delete и clear
+    случаются редко; они увеличивают эпоху в L2, и все процессы
+    сбрасывают свой L1 в начале следующего запроса. set() и add()
+    других процессов видны не позже, чем через L1_TIMEOUT.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self._store = get_store(params.get('NAME', location))
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_key(self, key, version):
+        return self.l2.make_key(key, version=version)
+
+    def _check_epoch(self):
+        store = self._store
+        if store.checked:
+            return
+        epoch = self.l2.get(EPOCH_KEY)
+        if epoch != store.epoch:
+            store.clear()
+            store.epoch = epoch
+        store.checked = True
+
+    def _bump_epoch(self):
+        try:
+            epoch = self.l2.incr(EPOCH_KEY)
+        except ValueError:
+            self.l2.add(EPOCH_KEY, _new_epoch(), None)
+            epoch = self.l2.get(EPOCH_KEY)
+        self._store.clear()
+        self._store.epoch = epoch
+
+    def _remember(self, items, version, timeout=DEFAULT_TIMEOUT):
+        lifetime = self._l1_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            lifetime = min(lifetime, timeout)
+        if lifetime <= 0:
+            self._store.discard(
+                [self._l1_key(key, version) for key, _ in items]
+            )
+            return
+        expires = time.monotonic() + lifetime
+        request = self._store.request
+        for key, value in items:
+            copied = has_response(value)
+            self._store.put(
+                self._l1_key(key, version),
+                (expires, request if is_counter(value) else None, copied,
+                 detach(value) if copied else value),
+                self._l1_max_entries,
+            )
+
+    def _value(self, entry):
+        _, _, copied, value = entry
+        return detach(value) if copied else value
+
+    def get(self, key, default=None, version=None):
+        self._check_epoch()
+        entry = self._store.get(self._l1_key(key, version))
+        if entry is not None:
+            return self._value(entry)
+        sentinel = object()
+        value = self.l2.get(key, sentinel, version=version)
+        if value is sentinel:
+            return default
+        self._remember([(key, value)], version)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._check_epoch()
+        found, missing = {}, []
+        for key in keys:
+            entry = self._store.get(self._l1_key(key, version))
+            if entry is None:
+                missing.append(key)
+            else:
+                found[key] = self._value(entry)
+        if missing:
+            fetched = self.l2.get_many(missing, version=version)
+            self._remember(fetched.items(), version)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        self._check_epoch()
+        if self._store.get(self._l1_key(key, version)) is not None:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._check_epoch()
+        failed = self.l2.set_many(data, timeout, version=version)
+        self._remember(
+            [item for item in data.items() if item[0] not in failed],
+            version, timeout,
+        )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._check_epoch()
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self._remember([(key, value)], version, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.l2.touch(key, timeout, version=version)
+        self._store.discard([self._l1_key(key, version)])
+        return touched
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self._remember([(key, value)], version)
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        self.l2.delete_many(keys, version=version)
+        self._bump_epoch()
+
+    def clear(self):
+        self.l2.clear()
+        self._bump_epoch()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
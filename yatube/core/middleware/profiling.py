@@ -0,0 +1,203 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+SALT = 'core.profiling'
+CACHE_METHODS = (
+    'add', 'get', 'set', 'touch', 'delete', 'get_many', 'has_key', 'incr',
+    'decr', 'set_many', 'delete_many', 'get_or_set',
+)
+STATS_SHOWN = 25
+
+_local = threading.local()
+_render_lock = threading.Lock()
+_render_profiled = 0
+
+
+def make_token():
+    """Значение заголовка X-Profile, которое включает профилирование."""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def token_is_valid(token):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class Timer:
+    """Суммарное время и число вызовов; вложенные вызовы не считаются."""
+
+    def __init__(self):
+        self.duration = 0
+        self.calls = 0
+        self.depth = 0
+
+    @contextmanager
+    def measure(self):
+        self.depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.duration += time.perf_counter() - started
+                self.calls += 1
+
+    def __call__(self, execute, *args):
+        with self.measure():
+            return execute(*args)
+
+    def wrap(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.measure():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def timed_render(render):
+    """Template.render, который меряет время, пока запрос профилируется."""
+    @wraps(render)
+    def wrapper(self, context):
+        timer = getattr(_local, 'templates', None)
+        if timer is None:
+            return render(self, context)
+        with timer.measure():
+            return render(self, context)
+    return wrapper
+
+
+def install_render_hook():
+    # Template.render подменяется для всего процесса, поэтому только
+    # пока идёт хотя бы один профилируемый запрос; соседние потоки
+    # в это время проходят через обёртку без замеров.
+    global _render_profiled
+    with _render_lock:
+        if not _render_profiled:
+            Template.render = timed_render(Template.render)
+        _render_profiled += 1
+
+
+def remove_render_hook():
+    global _render_profiled
+    with _render_lock:
+        _render_profiled -= 1
+        if not _render_profiled:
+            Template.render = Template.render.__wrapped__
+
+
+@contextmanager
+def timed_caches(timer):
+    # Экземпляры бэкендов кэша у каждого потока свои, поэтому их методы
+    # можно подменить на время запроса, не задевая соседние потоки.
+    backends = [caches[alias] for alias in settings.CACHES]
+    try:
+        for backend in backends:
+            for name in CACHE_METHODS:
+                setattr(backend, name, timer.wrap(getattr(backend, name)))
+        yield
+    finally:
+        for backend in backends:
+            for name in CACHE_METHODS:
+                backend.__dict__.pop(name, None)
+
+
+@contextmanager
+def timed_templates(timer):
+    install_render_hook()
+    _local.templates = timer
+    try:
+        yield
+    finally:
+        del _local.templates
+        remove_render_hook()
+
+
+def server_timing(timers, total):
+    """Значение заголовка Server-Timing в миллисекундах."""
+    metrics = [
+        f'{name};dur={timer.duration * 1000:.1f};desc="{timer.calls} calls"'
+        for name, timer in timers.items()
+    ]
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+class ProfilingMiddleware:
+    """Профилирует отдельные запросы по требованию.
+
+    Профилирование включается подписанным заголовком X-Profile (см.
+    make_token()) или параметром ?profile для сотрудников. Время в базе,
+    шаблонах и кэше отдаётся в заголовке Server-Timing; шаблоны включают
+    выполненные из них запросы. Статистика cProfile для view из
+    PROFILING_DUMP_APPS сохраняется в PROFILING_DUMP_DIR, а если каталог
+    не задан, пишется в лог.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_requested(request):
+            return self.get_response(request)
+        timers = {'db': Timer(), 'template': Timer(), 'cache': Timer()}
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            stack.enter_context(connection.execute_wrapper(timers['db']))
+            stack.enter_context(timed_templates(timers['template']))
+            stack.enter_context(timed_caches(timers['cache']))
+            response = profile.runcall(self.get_response, request)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = server_timing(timers, total)
+        self.save_stats(request, profile)
+        return response
+
+    def is_requested(self, request):
+        token = request.META.get('HTTP_X_PROFILE')
+        if token:
+            return token_is_valid(token)
+        user = getattr(request, 'user', None)
+        return (
+            settings.PROFILING_QUERY_PARAM in request.GET
+            and user is not None and user.is_staff
+        )
+
+    def save_stats(self, request, profile):
+        match = request.resolver_match
+        if match is None or match.app_name not in settings.PROFILING_DUMP_APPS:
+            return
+        if settings.PROFILING_DUMP_DIR:
+            os.makedirs(settings.PROFILING_DUMP_DIR, exist_ok=True)
+            name = '{}-{}.prof'.format(
+                match.view_name.replace(':', '.'), time.time_ns()
+            )
+            profile.dump_stats(os.path.join(settings.PROFILING_DUMP_DIR, name))
+            return
+        output = io.StringIO()
+        stats = pstats.Stats(profile, stream=output)
+        stats.sort_stats('cumulative').print_stats(STATS_SHOWN)
+        logger.info('Профиль %s:\n%s', match.view_name, output.getvalue())
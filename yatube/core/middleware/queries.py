@@ -0,0 +1,110 @@
+import logging
+import re
+import sys
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_shape(sql):
+    """Текст запроса без длины списков IN (...)."""
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+def template_location():
+    """Шаблон и строка, при рендеринге которой выполняется запрос."""
+    frame = sys._getframe()
+    while frame is not None:
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    """execute_wrapper, который запоминает запросы и место их вызова."""
+
+    def __init__(self):
+        self.shapes = Counter()
+        self.locations = defaultdict(set)
+
+    def __call__(self, execute, sql, params, many, context):
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        location = template_location()
+        if location is not None:
+            self.locations[shape].add(location)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def repeated(self, threshold):
+        """Запросы одного вида, выполненные не меньше threshold раз."""
+        return [
+            (shape, count, sorted(self.locations[shape]))
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы к базе и ищет N+1 в каждом запросе к сайту.
+
+    Бюджеты задаются в QUERY_BUDGETS по имени view (например,
+    'posts:main_page'). Превышение бюджета и повторяющиеся запросы
+    пишутся в лог, а при QUERY_BUDGET_RAISE = True превышение бюджета
+    приводит к QueryBudgetExceeded, что используется в тестах.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        response['X-Query-Count'] = recorder.count
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = settings.QUERY_BUDGETS.get(view_name)
+        repeated = recorder.repeated(settings.QUERY_REPEAT_THRESHOLD)
+        for shape, count, locations in repeated:
+            logger.warning(
+                'N+1 в %s: %d одинаковых запросов из %s: %s',
+                view_name, count, ', '.join(locations) or 'view', shape,
+            )
+        if budget is None or recorder.count <= budget:
+            return
+        message = (
+            f'{view_name}: {recorder.count} запросов при бюджете {budget}'
+        )
+        if repeated:
+            message += '; повторяются: ' + '; '.join(
+                f'{count}× {shape} ({", ".join(locations) or "view"})'
+                for shape, count, locations in repeated
+            )
+        if settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
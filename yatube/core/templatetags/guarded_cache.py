@@ -0,0 +1,72 @@
+from functools import partial
+
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import TemplateSyntaxError, VariableDoesNotExist
+from django.templatetags.cache import CacheNode
+
+from core.cache.stampede import get_or_compute
+
+register = template.Library()
+
+
+def resolve(variable, context):
+    try:
+        return variable.resolve(context)
+    except VariableDoesNotExist:
+        raise TemplateSyntaxError(
+            f'"guarded_cache" tag got an unknown variable: {variable.var!r}'
+        )
+
+
+class GuardedCacheNode(CacheNode):
+    def render(self, context):
+        timeout = resolve(self.expire_time_var, context)
+        if timeout is not None:
+            timeout = int(timeout)
+        fragment_cache = self.get_cache(context)
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [resolve(var, context) for var in self.vary_on],
+        )
+        return get_or_compute(
+            key, partial(self.nodelist.render, context), timeout,
+            cache=fragment_cache,
+        )
+
+    def get_cache(self, context):
+        if not self.cache_name:
+            try:
+                return caches['template_fragments']
+            except InvalidCacheBackendError:
+                return caches['default']
+        name = resolve(self.cache_name, context)
+        try:
+            return caches[name]
+        except InvalidCacheBackendError:
+            raise TemplateSyntaxError(f'Invalid cache name: {name!r}')
+
+
+@register.tag('guarded_cache')
+def do_guarded_cache(parser, token):
+    """{% cache %}, защищённый от одновременного пересчёта.
+
+    Аргументы те же, что у {% cache %}; фрагмент пересчитывает один
+    запрос, см. core.cache.stampede.get_or_compute().
+    """
+    nodelist = parser.parse(('endguarded_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.'
+        )
+    cache_name = None
+    if len(tokens) > 3 and tokens[-1].startswith('using='):
+        cache_name = parser.compile_filter(tokens.pop()[len('using='):])
+    return GuardedCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(bit) for bit in tokens[3:]],
+        cache_name,
+    )
@@ -0,0 +1,64 @@
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+# Фоновые процессы миниатюр переживают тест и пишут в MEDIA_ROOT,
+# который тест уже удалил, поэтому в тестах миниатюры создаются сразу.
+# Страница, вышедшая за бюджет запросов, в тестах — ошибка.
+TEST_SETTINGS = {
+    'POST_THUMBNAIL_WORKERS': 0,
+    'QUERY_BUDGET_RAISE': True,
+}
+FILE_BACKENDS = (
+    'core.cache.sqlite.SQLiteCache',
+    'django.core.cache.backends.filebased.FileBasedCache',
+)
+
+
+@contextmanager
+def isolated_caches():
+    """Те же CACHES, но файлы кэшей во временном каталоге.
+
+    Тесты и бенчмарки чистят кэш и пишут в него свои страницы и
+    поколения, поэтому кэш работающего сайта им отдавать нельзя. Кэши
+    в начале блока пустые, каталог удаляется в конце.
+    """
+    directory = tempfile.mkdtemp()
+    config = copy.deepcopy(settings.CACHES)
+    for alias, params in config.items():
+        if params['BACKEND'] in FILE_BACKENDS:
+            params['LOCATION'] = os.path.join(directory, alias)
+    try:
+        with override_settings(CACHES=config):
+            for alias in config:
+                caches[alias].clear()
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@contextmanager
+def test_environment():
+    """Настройки, с которыми идут тесты, на время блока."""
+    with override_settings(**TEST_SETTINGS), isolated_caches():
+        yield
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner, который запускает тесты в test_environment()."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._environment = test_environment()
+        self._environment.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._environment.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
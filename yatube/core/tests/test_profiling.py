@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.base import Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware.profiling import make_token
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:main_page')
+
+    def test_profiling_is_opt_in(self):
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {'profile': ''})
+        self.assertNotIn('Server-Timing', response)
+        response = self.client.get(self.url, HTTP_X_PROFILE='bad:token')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_signed_header(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE=make_token())
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'template;dur=', 'cache;dur=', 'total;'):
+            self.assertIn(metric, timing)
+        self.assertNotIn('template;dur=0.0', timing)
+
+    def test_render_hooked_only_while_profiling(self):
+        render = Template.render
+        self.client.get(self.url)
+        self.client.get(self.url, HTTP_X_PROFILE=make_token())
+        self.assertIs(Template.render, render)
+
+    def test_staff_query_param_dumps_stats(self):
+        self.client.force_login(self.staff)
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILING_DUMP_DIR=directory):
+                response = self.client.get(self.url, {'profile': ''})
+                self.client.get(reverse('about:author'), {'profile': ''})
+            self.assertIn('Server-Timing', response)
+            files = os.listdir(directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('posts.main_page-'))
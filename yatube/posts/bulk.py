@@ -0,0 +1,100 @@
+"""Массовая запись постов, комментариев и подписок.
+
+bulk_create не отправляет сигналы, поэтому ленты, счётчики и поколения
+кэша обновляются здесь так же, как это сделал бы posts.signals, но
+несколькими запросами на всю пачку. Функции нужно вызывать внутри
+transaction.atomic(). Вставка с чтением pk обратно рассчитана на
+SQLite, см. read_back_pks().
+"""
+from collections import Counter
+
+from django.db import NotSupportedError, connections, router, transaction
+
+from . import counters, feed
+from .cache import (bump_comments_generation, bump_count_generation,
+                    bump_index_generation, bump_object_generation)
+from .models import Comment, Follow, Post
+
+
+def bulk_create_with_pks(model, objs, date_field):
+    """bulk_create, после которого у объектов есть pk и заданные даты.
+
+    Поле с auto_now_add bulk_create перезаписывает текущим временем,
+    поэтому явно заданные даты возвращаются отдельным bulk_update.
+    """
+    dates = [getattr(obj, date_field) for obj in objs]
+    with transaction.atomic(using=router.db_for_write(model)):
+        model.objects.bulk_create(objs)
+        if objs and objs[0].pk is None:
+            read_back_pks(model, objs)
+        dated = []
+        for obj, date in zip(objs, dates):
+            if date is not None:
+                setattr(obj, date_field, date)
+                dated.append(obj)
+        model.objects.bulk_update(dated, [date_field])
+    return objs
+
+
+def read_back_pks(model, objs):
+    """Проставляет pk только что вставленным объектам.
+
+    Работает только в SQLite, которая не возвращает id после
+    bulk_create: первая запись в транзакции берёт блокировку на запись
+    всей базы, поэтому до коммита другие соединения ничего не вставят
+    и последние len(objs) строк таблицы — наши. Вызывать в той же
+    транзакции, что и bulk_create. Базы, которые id возвращают, сюда
+    не попадают, а на остальных чтение было бы гонкой.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor != 'sqlite' or not connection.in_atomic_block:
+        raise NotSupportedError(
+            'pk после bulk_create читаются обратно только в SQLite '
+            'внутри транзакции.'
+        )
+    pks = model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    )[:len(objs)]
+    for obj, pk in zip(objs, reversed(list(pks))):
+        obj.pk = pk
+
+
+def create_posts(posts):
+    for post in posts:
+        post.render_text()
+    bulk_create_with_pks(Post, posts, 'pub_date')
+    feed.fan_out_posts(posts)
+    for author_id, count in Counter(p.author_id for p in posts).items():
+        counters.change_user_stat(author_id, 'posts_count', count)
+        bump_object_generation('author', author_id)
+    for group_id in {post.group_id for post in posts}:
+        bump_object_generation('group', group_id)
+    bump_index_generation()
+    bump_count_generation()
+    return posts
+
+
+def create_comments(comments):
+    bulk_create_with_pks(Comment, comments, 'created')
+    for post_id, count in Counter(c.post_id for c in comments).items():
+        counters.change_comments_count(post_id, count)
+        bump_object_generation('post', post_id)
+    bump_comments_generation()
+    return comments
+
+
+def create_follows(follows):
+    """Подписки не должны повторять уже существующие."""
+    Follow.objects.bulk_create(follows)
+    for follow in follows:
+        feed.backfill(follow.user_id, follow.author_id)
+    changes = (
+        ('following_count', Counter(f.user_id for f in follows)),
+        ('followers_count', Counter(f.author_id for f in follows)),
+    )
+    for field, counts in changes:
+        for user_id, count in counts.items():
+            counters.change_user_stat(user_id, field, count)
+            bump_object_generation('author', user_id)
+    bump_count_generation()
+    return follows
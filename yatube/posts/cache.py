@@ -0,0 +1,124 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+INDEX_GENERATION_KEY = 'posts:index_page:generation'
+COUNT_GENERATION_KEY = 'posts:count:generation'
+
+
+def _new_generation():
+    # Если счётчик вытеснили из кэша, новое значение не должно совпасть
+    # ни с одним из тех, под которыми ещё могут лежать старые данные.
+    return int(time.time() * 1000)
+
+
+def get_generation(key):
+    """Текущее поколение данных для построения ключей кэша."""
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key):
+    """Делает устаревшими все записи кэша, построенные на поколении."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _new_generation(), None)
+
+
+def index_generation():
+    return get_generation(INDEX_GENERATION_KEY)
+
+
+def bump_index_generation():
+    bump_generation(INDEX_GENERATION_KEY)
+
+
+def count_generation():
+    return get_generation(COUNT_GENERATION_KEY)
+
+
+def bump_count_generation():
+    bump_generation(COUNT_GENERATION_KEY)
+
+
+# Имена пользователей и названия групп выводятся почти на каждой странице,
+# а меняются редко, поэтому отдельного поколения на объект для них нет.
+NAMES_GENERATION_KEY = 'posts:names:generation'
+# Число комментариев есть только на странице поста и в ответах API; для
+# лент API хватает одного поколения на все комментарии.
+COMMENTS_GENERATION_KEY = 'posts:comments:generation'
+PAGE_KEY = 'posts:page:{}'
+
+
+def object_generation_key(model_name, pk):
+    """Ключ поколения страниц одного поста, автора или группы."""
+    return f'posts:{model_name}:{pk}:generation'
+
+
+def bump_object_generation(model_name, pk):
+    if pk is not None:
+        bump_generation(object_generation_key(model_name, pk))
+
+
+def bump_names_generation():
+    bump_generation(NAMES_GENERATION_KEY)
+
+
+def bump_comments_generation():
+    bump_generation(COMMENTS_GENERATION_KEY)
+
+
+def get_generations(keys):
+    """Текущие поколения сразу для нескольких ключей."""
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            generations[key] = get_generation(key)
+    return generations
+
+
+def page_etag(request, generations):
+    """ETag страницы по поколениям данных, из которых она собрана.
+
+    Страницы отличаются для разных пользователей и параметров запроса,
+    поэтому они тоже входят в ETag.
+    """
+    return generations_etag(
+        [str(request.user.pk), request.GET.urlencode()], generations
+    )
+
+
+def generations_etag(parts, generations):
+    """ETag из поколений данных и того, чем ещё различаются ответы."""
+    parts = list(parts)
+    parts.extend(f'{key}={generations[key]}' for key in sorted(generations))
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def _page_key(request):
+    path = request.get_full_path().encode()
+    return PAGE_KEY.format(hashlib.md5(path).hexdigest())
+
+
+def get_cached_page(request):
+    """Сохранённый ответ и его поколения, если ни одно не сменилось."""
+    cached = cache.get(_page_key(request))
+    if cached is None:
+        return None
+    response, generations = cached
+    if cache.get_many(list(generations)) != generations:
+        return None
+    return cached
+
+
+def set_cached_page(request, response, generations):
+    cache.set(
+        _page_key(request), (response, generations),
+        settings.PAGE_CACHE_TIMEOUT,
+    )
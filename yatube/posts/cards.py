@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import thumbnails
+from .cache import NAMES_GENERATION_KEY, get_generation, object_generation_key
+
+CARD_KEY = 'posts:card:{}'
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_GEOMETRY = '500'
+
+
+def render_cards(posts):
+    """HTML карточек постов для ленты: {pk поста: html}.
+
+    Карточка хранится в кэше вместе с версией — поколением поста и
+    поколением имён, — поэтому правка поста, перенос в другую группу и
+    смена имени автора делают её устаревшей. Карточки и поколения всей
+    страницы читаются одним get_many(), устаревшие и отсутствующие
+    рендерятся заново и записываются одним set_many().
+    """
+    posts = list(posts)
+    keys = {post.pk: CARD_KEY.format(post.pk) for post in posts}
+    generation_keys = {
+        post.pk: object_generation_key('post', post.pk) for post in posts
+    }
+    cached = cache.get_many([
+        *keys.values(), *generation_keys.values(), NAMES_GENERATION_KEY,
+    ])
+    for key in [*generation_keys.values(), NAMES_GENERATION_KEY]:
+        if key not in cached:
+            cached[key] = get_generation(key)
+    cards, stale = {}, []
+    for post in posts:
+        version = (
+            cached[generation_keys[post.pk]], cached[NAMES_GENERATION_KEY]
+        )
+        card = cached.get(keys[post.pk])
+        if card is not None and card[0] == version:
+            cards[post.pk] = card[1]
+        else:
+            stale.append((post, version))
+    if stale:
+        cards.update(render_stale(stale, keys))
+    return {pk: mark_safe(html) for pk, html in cards.items()}
+
+
+def render_stale(stale, keys):
+    urls = thumbnails.resolve_urls([post for post, _ in stale], CARD_GEOMETRY)
+    rendered, entries = {}, {}
+    for post, version in stale:
+        post.thumbnail_url = urls.get(post.pk)
+        html = render_to_string(CARD_TEMPLATE, {'post': post})
+        rendered[post.pk] = html
+        entries[keys[post.pk]] = (version, html)
+    cache.set_many(entries, settings.POST_CARD_CACHE_TIMEOUT)
+    return rendered
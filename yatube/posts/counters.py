@@ -0,0 +1,25 @@
+from django.db.models import F
+
+from .models import Post, UserStats
+
+
+def change_user_stat(user_id, field, delta):
+    """Атомарно сдвигает счётчик пользователя на delta."""
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        # Не уводим счётчик в минус, если он уже разошёлся с данными:
+        # это исправит reconcile_counters.
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        # Строки со счётчиками ещё нет: создаём её и повторяем update,
+        # чтобы не потерять параллельное изменение.
+        UserStats.objects.get_or_create(user_id=user_id)
+        stats.update(**{field: F(field) + delta})
+
+
+def change_comments_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F('comments_count') + delta)
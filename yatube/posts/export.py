@@ -0,0 +1,69 @@
+"""Потоковая выгрузка постов и комментариев в JSONL и CSV.
+
+Строки читаются из базы пачками через .iterator() и сразу отдаются
+дальше, поэтому память не зависит от размера таблицы. Поля совпадают
+с тем, что принимает команда import_content.
+"""
+import csv
+import json
+from datetime import datetime
+
+CHUNK_SIZE = 2000
+
+POST_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'group': 'group__slug',
+    'pub_date': 'pub_date',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def export_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    names = list(fields)
+    values = queryset.order_by('pk').values_list(*fields.values())
+    for row in values.iterator(chunk_size=chunk_size):
+        yield {
+            name: value.isoformat() if isinstance(value, datetime) else value
+            for name, value in zip(names, row)
+        }
+
+
+def to_jsonl(rows, fields):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """Файл для csv.writer, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def to_csv(rows, fields):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([row[field] for field in fields])
+
+
+WRITERS = {'jsonl': to_jsonl, 'csv': to_csv}
+
+
+def export_lines(queryset, fields, file_format, chunk_size=CHUNK_SIZE):
+    """Строки файла выгрузки по одной, в формате jsonl или csv."""
+    rows = export_rows(queryset, fields, chunk_size)
+    return WRITERS[file_format](rows, list(fields))
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from itertools import islice
+
+from .models import FeedEntry, Follow, Post
+
+CHUNK_SIZE = 10000
+
+
+def _insert(entries):
+    # bulk_create собирает все объекты в список, поэтому записи
+    # передаются ему частями: у звёзд подписчиков и постов очень много.
+    # batch_size не задаётся: Django сам режет вставку под лимиты SQLite
+    # на число параметров и SELECT в составном запросе (500), а явный
+    # batch_size их не учитывает.
+    entries = iter(entries)
+    while True:
+        chunk = list(islice(entries, CHUNK_SIZE))
+        if not chunk:
+            return
+        FeedEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert(
+        FeedEntry(user_id=user_id, post=post, author_id=post.author_id,
+                  pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика все посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    _insert(
+        FeedEntry(user_id=user_id, post_id=post_id, author_id=author_id,
+                  pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def purge(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def fan_out_posts(posts):
+    """То же, что fan_out_post, для пачки постов: один запрос подписчиков."""
+    followers = defaultdict(list)
+    pairs = Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).values_list('author_id', 'user_id')
+    for author_id, user_id in pairs.iterator():
+        followers[author_id].append(user_id)
+    _insert(
+        FeedEntry(user_id=user_id, post_id=post.pk,
+                  author_id=post.author_id, pub_date=post.pub_date)
+        for post in posts for user_id in followers[post.author_id]
+    )
@@ -0,0 +1,83 @@
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .forms import CommentForm
+from .models import Follow
+
+HOLE = '<!--hole:{}-->'
+HOLE_RE = re.compile(r'<!--hole:([\w=-]+)-->')
+
+FRAGMENTS = {}
+
+
+def fragment(func):
+    """Регистрирует личный фрагмент страницы под именем функции."""
+    FRAGMENTS[func.__name__] = func
+    return func
+
+
+@fragment
+def header_nav(request):
+    return render_to_string('includes/header_nav.html', request=request)
+
+
+@fragment
+def feed_switcher(request, active):
+    return render_to_string(
+        'posts/includes/switcher.html', {active: True}, request=request
+    )
+
+
+@fragment
+def post_edit_button(request, post_id, author_id):
+    context = {
+        'post_id': post_id,
+        'is_author': request.user.pk == author_id,
+    }
+    return render_to_string(
+        'posts/includes/post_edit_button.html', context, request=request
+    )
+
+
+@fragment
+def comment_form(request, post_id):
+    context = {'post_id': post_id, 'form': CommentForm()}
+    return render_to_string(
+        'posts/includes/comment_form.html', context, request=request
+    )
+
+
+@fragment
+def follow_button(request, author_id, username):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author_id=author_id
+    ).exists()
+    context = {'username': username, 'following': following}
+    return render_to_string(
+        'posts/includes/follow_button.html', context, request=request
+    )
+
+
+def punch(request, name, **kwargs):
+    """Метка на месте личного фрагмента.
+
+    Если страница собирается в два прохода (request.punch_holes), в ней
+    остаётся метка, общая для всех пользователей, иначе фрагмент
+    рисуется сразу.
+    """
+    if not getattr(request, 'punch_holes', False):
+        return FRAGMENTS[name](request, **kwargs)
+    payload = json.dumps([name, kwargs]).encode()
+    return mark_safe(HOLE.format(base64.urlsafe_b64encode(payload).decode()))
+
+
+def fill_holes(request, content):
+    """Заменяет метки в общей странице на фрагменты для этого запроса."""
+    def render(match):
+        name, kwargs = json.loads(base64.urlsafe_b64decode(match.group(1)))
+        return FRAGMENTS[name](request, **kwargs)
+    return HOLE_RE.sub(render, content)
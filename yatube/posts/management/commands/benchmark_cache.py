@@ -0,0 +1,144 @@
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.sqlite.SQLiteCache',
+}
+LOCATIONS = {
+    'locmem': lambda directory: 'benchmark',
+    'file': lambda directory: os.path.join(directory, 'file'),
+    'sqlite': lambda directory: os.path.join(directory, 'cache.sqlite3'),
+}
+PAGE_SIZE = 20
+
+
+def make_cache(name, directory):
+    backend = import_string(BACKENDS[name])
+    return backend(LOCATIONS[name](directory), {
+        'TIMEOUT': None, 'OPTIONS': {'MAX_ENTRIES': 10 ** 6},
+    })
+
+
+def timed(func, operations):
+    started = time.perf_counter()
+    func()
+    return operations / (time.perf_counter() - started)
+
+
+def single_process(cache, keys, payload):
+    """Операций в секунду для основных методов кэша."""
+    pages = [keys[i:i + PAGE_SIZE] for i in range(0, len(keys), PAGE_SIZE)]
+    cache.set('counter', 0)
+    return {
+        'set': timed(lambda: [cache.set(key, payload) for key in keys],
+                     len(keys)),
+        'get': timed(lambda: [cache.get(key) for key in keys], len(keys)),
+        'get_many': timed(lambda: [cache.get_many(page) for page in pages],
+                          len(keys)),
+        'incr': timed(lambda: [cache.incr('counter') for _ in keys],
+                      len(keys)),
+    }
+
+
+def shared_workload(name, directory, keys, payload, operations, seed, queue):
+    """Читает ключи по степенному закону и досоздаёт промахи."""
+    cache = make_cache(name, directory)
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(keys) + 1)]
+    choices = rng.choices(keys, weights, k=operations)
+    hits = 0
+    started = time.perf_counter()
+    for key in choices:
+        if cache.get(key) is None:
+            cache.set(key, payload)
+        else:
+            hits += 1
+    queue.put((hits, time.perf_counter() - started))
+
+
+def multi_process(name, directory, keys, payload, processes, operations):
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    workers = [
+        context.Process(target=shared_workload, args=(
+            name, directory, keys, payload, operations, seed, queue,
+        ))
+        for seed in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    results = [queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    total = processes * operations
+    return {
+        'ops': total / max(elapsed for _, elapsed in results),
+        'hit_ratio': sum(hits for hits, _ in results) / total,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает бэкенды кэша locmem, file и sqlite: скорость основных '
+        'операций в одном процессе и долю попаданий при общей нагрузке '
+        'из нескольких процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends', default=','.join(BACKENDS),
+            help='Какие бэкенды сравнивать, через запятую.',
+        )
+        parser.add_argument('--keys', type=int, default=2000)
+        parser.add_argument(
+            '--value-size', type=int, default=2048,
+            help='Размер значения в байтах.',
+        )
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument(
+            '--operations', type=int, default=5000,
+            help='Сколько чтений делает каждый процесс.',
+        )
+        parser.add_argument('--output', help='Куда сохранить результаты.')
+
+    def handle(self, *args, **options):
+        keys = [f'benchmark:{i}' for i in range(options['keys'])]
+        payload = 'x' * options['value_size']
+        results = {}
+        for name in options['backends'].split(','):
+            directory = tempfile.mkdtemp()
+            try:
+                cache = make_cache(name, directory)
+                result = single_process(cache, keys, payload)
+                # Общая нагрузка начинается с пустого кэша: так видно,
+                # сколько промахов добавляет отдельный кэш у процесса.
+                cache.clear()
+                result['shared'] = multi_process(
+                    name, directory, keys, payload,
+                    options['processes'], options['operations'],
+                )
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            results[name] = result
+            self.stdout.write(
+                f'{name:>7}: ' + ', '.join(
+                    f'{op} {result[op]:.0f}/с'
+                    for op in ('set', 'get', 'get_many', 'incr')
+                )
+                + f'; процессов {options["processes"]}: '
+                f'{result["shared"]["ops"]:.0f} чтений/с, попаданий '
+                f'{result["shared"]["hit_ratio"]:.0%}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,224 @@
+import json
+import math
+import time
+import tracemalloc
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import isolated_caches
+from posts.models import Group, Post, UserStats
+
+VIEWS = (
+    'index', 'group_show', 'profile', 'post_detail', 'follow_index',
+    'add_comment', 'post_create',
+)
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу."""
+    values = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def dataset(size):
+    """Объёмы данных для seed_data при size постов."""
+    users = max(size // 50, 10)
+    return {
+        'posts': size,
+        'users': users,
+        'groups': max(size // 1000, 3),
+        'comments': size * 2,
+        'follows': min(users * 10, users * (users - 1)),
+    }
+
+
+def view_requests(targets):
+    """Метод, URL и данные запроса для каждой view."""
+    post_id = targets['post'].pk
+    return {
+        'index': ('get', reverse('posts:main_page'), None),
+        'group_show': ('get', reverse(
+            'posts:posts_list', kwargs={'slug': targets['group'].slug}
+        ), None),
+        'profile': ('get', reverse(
+            'posts:profile', kwargs={'username': targets['author']}
+        ), None),
+        'post_detail': ('get', reverse(
+            'posts:post_detail', kwargs={'post_id': post_id}
+        ), None),
+        'follow_index': ('get', reverse('posts:follow_index'), None),
+        'add_comment': ('post', reverse(
+            'posts:add_comment', kwargs={'post_id': post_id}
+        ), {'text': 'комментарий из бенчмарка'}),
+        'post_create': ('post', reverse('posts:post_create'), {
+            'text': 'пост из бенчмарка', 'group': targets['group'].pk,
+        }),
+    }
+
+
+def find_targets():
+    """Самые тяжёлые объекты набора: на них и меряются страницы."""
+    return {
+        'group': Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total').first(),
+        'author': UserStats.objects.order_by(
+            '-posts_count'
+        ).values_list('user__username', flat=True).first(),
+        'post': Post.objects.order_by('-comments_count').first(),
+        'reader': UserStats.objects.order_by(
+            '-following_count'
+        ).select_related('user').first().user,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет задержку, число запросов и пиковую память view на '
+        'синтетических данных растущего объёма во временной базе. '
+        'Результаты сохраняются в JSON и сравниваются с прошлым запуском.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1000,10000',
+            help='Число постов в наборах данных, через запятую.',
+        )
+        parser.add_argument(
+            '--views', default=','.join(VIEWS),
+            help='Какие view мерить, через запятую.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Сколько замеров делать для каждой view.',
+        )
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Не очищать кэш перед запросами: мерить попадания в кэш.',
+        )
+        parser.add_argument('--output', help='Куда сохранить результаты.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого запуска для сравнения.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=20,
+            help='На сколько процентов может вырасти p95 без тревоги.',
+        )
+
+    def handle(self, *args, **options):
+        views = options['views'].split(',')
+        unknown = set(views) - set(VIEWS)
+        if unknown:
+            raise CommandError(f'Неизвестные view: {", ".join(unknown)}')
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.options = options
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(QUERY_BUDGET_ENABLED=False), \
+                    isolated_caches():
+                results = [
+                    result for size in sizes
+                    for result in self.run_size(size, views)
+                ]
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        report = {'created': timezone.now().isoformat(), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def run_size(self, size, views):
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        call_command('seed_data', seed=size, stdout=StringIO(),
+                     **dataset(size))
+        targets = find_targets()
+        client = Client()
+        client.force_login(targets['reader'])
+        requests = view_requests(targets)
+        for view in views:
+            result = self.measure(client, *requests[view])
+            result.update(view=view, size=size)
+            self.stdout.write(
+                f'{view:>12} {size:>8}: p50 {result["p50_ms"]:.1f} мс, '
+                f'p95 {result["p95_ms"]:.1f} мс, '
+                f'p99 {result["p99_ms"]:.1f} мс, '
+                f'запросов {result["queries"]}, '
+                f'память {result["peak_kb"]:.0f} КБ'
+            )
+            yield result
+
+    def request(self, client, method, url, data):
+        if not self.options['warm_cache']:
+            cache.clear()
+        return getattr(client, method)(url, data)
+
+    def measure(self, client, method, url, data):
+        self.request(client, method, url, data)
+        timings = []
+        for _ in range(self.options['repeat']):
+            started = time.perf_counter()
+            self.request(client, method, url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        with CaptureQueriesContext(connection) as queries:
+            self.request(client, method, url, data)
+        # Следующий запрос очистит журнал запросов, поэтому считаем сразу.
+        queries = len(queries)
+        # Память меряется отдельным запросом: tracemalloc замедляет код
+        # и исказил бы задержки.
+        tracemalloc.start()
+        try:
+            self.request(client, method, url, data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'queries': queries,
+            'peak_kb': peak / 1024,
+        }
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            previous = {
+                (item['view'], item['size']): item
+                for item in json.load(file)['results']
+            }
+        limit = 1 + self.options['threshold'] / 100
+        regressions = []
+        for result in results:
+            old = previous.get((result['view'], result['size']))
+            if old is None:
+                continue
+            key = f'{result["view"]} на {result["size"]} постах'
+            if result['p95_ms'] > old['p95_ms'] * limit:
+                regressions.append(
+                    f'{key}: p95 {old["p95_ms"]:.1f} → '
+                    f'{result["p95_ms"]:.1f} мс'
+                )
+            if result['queries'] > old['queries']:
+                regressions.append(
+                    f'{key}: запросов {old["queries"]} → '
+                    f'{result["queries"]}'
+                )
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+
+from posts import export
+from posts.models import Comment, Post
+
+SOURCES = {
+    'posts': (Post.objects, export.POST_FIELDS),
+    'comments': (Comment.objects, export.COMMENT_FIELDS),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает все посты или комментарии в JSONL или CSV, '
+        'не загружая таблицу в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(SOURCES))
+        parser.add_argument(
+            '--format', choices=sorted(export.WRITERS), default='jsonl',
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--user', dest='username',
+            help='Выгрузить только записи этого пользователя.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, **options):
+        manager, fields = SOURCES[options['kind']]
+        queryset = manager.all()
+        if options['username']:
+            queryset = queryset.filter(author__username=options['username'])
+        lines = export.export_lines(
+            queryset, fields, options['format'], options['chunk_size']
+        )
+        with self.open_output(options['output']) as write:
+            for line in lines:
+                write(line)
+
+    @contextmanager
+    def open_output(self, path):
+        if not path:
+            yield lambda line: self.stdout.write(line, ending='')
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            yield file.write
@@ -0,0 +1,297 @@
+import csv
+from abc import ABC, abstractmethod
+import json
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import bulk
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+
+ERRORS_SHOWN = 20
+
+
+def clean_field(form_class, name, value):
+    """Проверяет значение по правилам поля формы."""
+    return form_class.base_fields[name].clean(value)
+
+
+def clean_date(value):
+    if not value:
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        raise ValidationError(f'Некорректная дата «{value}».')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Importer(ABC):
+    """Превращает строки входного файла в объекты моделей.
+
+    Пользователи, группы и посты ищутся по словарям, которые
+    дополняются одним запросом на пачку строк.
+    """
+
+    def __init__(self):
+        self.users = {}
+
+    def load(self, mapping, queryset, field, keys):
+        missing = {key for key in keys if key and key not in mapping}
+        if not missing:
+            return
+        mapping.update(
+            queryset.filter(**{f'{field}__in': missing})
+            .values_list(field, 'pk')
+        )
+        for key in missing:
+            mapping.setdefault(key, None)
+
+    def lookup(self, mapping, key, message):
+        if not key:
+            raise ValidationError(message.format(''))
+        pk = mapping.get(key)
+        if pk is None:
+            raise ValidationError(message.format(key))
+        return pk
+
+    def load_users(self, rows, *fields):
+        self.load(self.users, User.objects, 'username', (
+            row.get(field) for row in rows for field in fields
+        ))
+
+    def clean(self, batch):
+        """Объекты для записи, ошибки по строкам и число пропущенных."""
+        rows = [row for _, row in batch if isinstance(row, dict)]
+        self.prepare(rows)
+        objs, errors, skipped = [], [], 0
+        for line, row in batch:
+            if not isinstance(row, dict):
+                errors.append((line, 'Строка не разобрана.'))
+                continue
+            try:
+                obj = self.build(row)
+            except ValidationError as exc:
+                errors.append((line, ' '.join(exc.messages)))
+                continue
+            if obj is None:
+                skipped += 1
+            else:
+                objs.append(obj)
+        return objs, errors, skipped
+
+    @abstractmethod
+    def prepare(self, rows):
+        """Загружает всё, на что ссылаются строки пачки."""
+
+    @abstractmethod
+    def build(self, row):
+        """Объект из строки, None для пропуска или ValidationError."""
+
+    @abstractmethod
+    def save(self, objs):
+        """Записывает пачку проверенных объектов."""
+
+
+class PostImporter(Importer):
+    def __init__(self):
+        super().__init__()
+        self.groups = {}
+
+    def prepare(self, rows):
+        self.load_users(rows, 'author')
+        self.load(self.groups, Group.objects, 'slug', (
+            row.get('group') for row in rows
+        ))
+
+    def build(self, row):
+        group_id = None
+        if row.get('group'):
+            group_id = self.lookup(
+                self.groups, row['group'], 'Нет группы «{}».'
+            )
+        return Post(
+            text=clean_field(PostForm, 'text', row.get('text')),
+            author_id=self.lookup(
+                self.users, row.get('author'), 'Нет пользователя «{}».'
+            ),
+            group_id=group_id,
+            pub_date=clean_date(row.get('pub_date')),
+        )
+
+    def save(self, objs):
+        bulk.create_posts(objs)
+
+
+class CommentImporter(Importer):
+    def __init__(self):
+        super().__init__()
+        self.posts = {}
+
+    def prepare(self, rows):
+        self.load_users(rows, 'author')
+        post_ids = []
+        for row in rows:
+            try:
+                post_ids.append(int(row.get('post')))
+            except (TypeError, ValueError):
+                pass
+        self.load(self.posts, Post.objects, 'pk', post_ids)
+
+    def build(self, row):
+        try:
+            post_id = int(row.get('post'))
+        except (TypeError, ValueError):
+            raise ValidationError(
+                f'Некорректный id поста «{row.get("post")}».'
+            )
+        return Comment(
+            text=clean_field(CommentForm, 'text', row.get('text')),
+            author_id=self.lookup(
+                self.users, row.get('author'), 'Нет пользователя «{}».'
+            ),
+            post_id=self.lookup(self.posts, post_id, 'Нет поста {}.'),
+            created=clean_date(row.get('created')),
+        )
+
+    def save(self, objs):
+        bulk.create_comments(objs)
+
+
+class FollowImporter(Importer):
+    def prepare(self, rows):
+        self.load_users(rows, 'user', 'author')
+        user_ids = {self.users.get(row.get('user')) for row in rows}
+        self.existing = set(
+            Follow.objects.filter(user_id__in=user_ids - {None})
+            .values_list('user_id', 'author_id')
+        )
+
+    def build(self, row):
+        user_id = self.lookup(
+            self.users, row.get('user'), 'Нет пользователя «{}».'
+        )
+        author_id = self.lookup(
+            self.users, row.get('author'), 'Нет пользователя «{}».'
+        )
+        if user_id == author_id:
+            raise ValidationError('Нельзя подписаться на самого себя.')
+        if (user_id, author_id) in self.existing:
+            return None
+        self.existing.add((user_id, author_id))
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def save(self, objs):
+        bulk.create_follows(objs)
+
+
+IMPORTERS = {
+    'posts': PostImporter,
+    'comments': CommentImporter,
+    'follows': FollowImporter,
+}
+
+
+def read_jsonl(file):
+    for line, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError:
+            yield line, None
+
+
+def read_csv(file):
+    # Первая строка файла — заголовок с именами полей.
+    for line, row in enumerate(csv.DictReader(file), 2):
+        yield line, row
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv}
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def open_input(path):
+    if path == '-':
+        yield sys.stdin
+        return
+    with open(path, encoding='utf-8', newline='') as file:
+        yield file
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует посты, комментарии или подписки из JSONL '
+        'или CSV. Каждая пачка пишется в своей транзакции; строки с '
+        'ошибками пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='Файл или «-» для stdin.')
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Формат файла; по умолчанию по расширению, иначе jsonl.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк записывать в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        importer = IMPORTERS[options['kind']]()
+        self.started = time.monotonic()
+        self.totals = dict.fromkeys(
+            ('rows', 'created', 'skipped', 'errors'), 0
+        )
+        with open_input(path) as file:
+            rows = READERS[file_format](file)
+            for batch in batches(rows, options['batch_size']):
+                self.import_batch(importer, batch)
+        self.stdout.write(self.style.SUCCESS(self.progress()))
+
+    def import_batch(self, importer, batch):
+        objs, errors, skipped = importer.clean(batch)
+        with transaction.atomic():
+            importer.save(objs)
+        for line, message in errors:
+            if self.totals['errors'] < ERRORS_SHOWN:
+                self.stderr.write(f'Строка {line}: {message}')
+            self.totals['errors'] += 1
+        self.totals['rows'] += len(batch)
+        self.totals['created'] += len(objs)
+        self.totals['skipped'] += skipped
+        self.stdout.write(self.progress())
+
+    def progress(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        totals = self.totals
+        return (
+            f'Строк: {totals["rows"]}, создано: {totals["created"]}, '
+            f'пропущено: {totals["skipped"]}, '
+            f'с ошибками: {totals["errors"]}, '
+            f'{totals["rows"] / elapsed:.0f} строк/с'
+        )
@@ -0,0 +1,41 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для картинок уже опубликованных постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число процессов; 0 — создавать в текущем процессе.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=20,
+            help='Сколько картинок отдавать процессу за раз.',
+        )
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='').order_by('pk')
+            .values_list('image', flat=True).iterator()
+        )
+        if options['workers']:
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                initializer=thumbnails.init_worker,
+            ) as executor:
+                results = list(executor.map(
+                    thumbnails.generate_in_worker, names,
+                    chunksize=options['chunk_size'],
+                ))
+        else:
+            results = [thumbnails.generate(name) for name in names]
+        failed = results.count(False)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {len(results)}, с ошибками: {failed}'
+        ))
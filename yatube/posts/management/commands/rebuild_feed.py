@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='username',
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.order_by('user_id')
+        entries = FeedEntry.objects.all()
+        if options['username']:
+            follows = follows.filter(user__username=options['username'])
+            entries = entries.filter(user__username=options['username'])
+        with transaction.atomic():
+            deleted, _ = entries.delete()
+            pairs = follows.values_list('user_id', 'author_id')
+            for user_id, author_id in pairs.iterator():
+                feed.backfill(user_id, author_id)
+        created = entries.count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {deleted}, записей в лентах: {created}'
+        ))
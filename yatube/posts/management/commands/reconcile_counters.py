@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.cache import bump_comments_generation, bump_object_generation
+from posts.models import Comment, Follow, Post, User, UserStats
+
+USER_FIELDS = ('posts_count', 'followers_count', 'following_count')
+
+
+def pk_batches(queryset, batch_size):
+    """Отдаёт первичные ключи пачками, без OFFSET."""
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def count_by(queryset, field, pks):
+    return dict(
+        queryset.filter(**{f'{field}__in': pks})
+        .values_list(field).annotate(Count('pk')).order_by()
+    )
+
+
+def user_counts(pks):
+    return {
+        'posts_count': count_by(Post.objects, 'author_id', pks),
+        'followers_count': count_by(Follow.objects, 'author_id', pks),
+        'following_count': count_by(Follow.objects, 'user_id', pks),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с данными и чинит расхождения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько строк проверять в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users_fixed = self.reconcile_users(batch_size)
+        posts_fixed = self.reconcile_posts(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено пользователей: {users_fixed}, '
+            f'постов: {posts_fixed}'
+        ))
+
+    def reconcile_users(self, batch_size):
+        fixed = 0
+        for pks in pk_batches(User.objects.all(), batch_size):
+            # Считать нужно после блокировки строк: запись, сделанная
+            # между подсчётом и блокировкой, иначе затёрлась бы.
+            with transaction.atomic():
+                stats = UserStats.objects.select_for_update().in_bulk(pks)
+                missing = [
+                    UserStats(user_id=pk) for pk in pks if pk not in stats
+                ]
+                UserStats.objects.bulk_create(missing, ignore_conflicts=True)
+                stats.update((item.user_id, item) for item in missing)
+                actual = user_counts(pks)
+                changed = []
+                for pk, item in stats.items():
+                    values = {
+                        field: actual[field].get(pk, 0)
+                        for field in USER_FIELDS
+                    }
+                    if any(getattr(item, field) != value
+                           for field, value in values.items()):
+                        for field, value in values.items():
+                            setattr(item, field, value)
+                        changed.append(item)
+                UserStats.objects.bulk_update(changed, USER_FIELDS)
+            # Страницы, закэшированные с неверными числами, устаревают.
+            for item in changed:
+                bump_object_generation('author', item.user_id)
+            fixed += len(changed)
+        return fixed
+
+    def reconcile_posts(self, batch_size):
+        fixed = 0
+        for pks in pk_batches(Post.objects.all(), batch_size):
+            with transaction.atomic():
+                posts = Post.objects.select_for_update().only(
+                    'comments_count'
+                ).in_bulk(pks)
+                actual = count_by(Comment.objects, 'post_id', pks)
+                changed = []
+                for pk, post in posts.items():
+                    if post.comments_count != actual.get(pk, 0):
+                        post.comments_count = actual.get(pk, 0)
+                        changed.append(post)
+                Post.objects.bulk_update(changed, ['comments_count'])
+            for post in changed:
+                bump_object_generation('post', post.pk)
+            if changed:
+                bump_comments_generation()
+            fixed += len(changed)
+        return fixed
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+
+from .reconcile_counters import pk_batches
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет text_html у постов, сохранённых до его появления; '
+        'с --all перерендеривает текст всех постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов обновлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перерендерить и уже заполненные посты.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if not options['all']:
+            posts = posts.filter(text_html='')
+        rendered = 0
+        for pks in pk_batches(posts, options['batch_size']):
+            with transaction.atomic():
+                batch = list(Post.objects.filter(pk__in=pks).only('text'))
+                for post in batch:
+                    post.render_text()
+                Post.objects.bulk_update(batch, ['text_html'])
+            rendered += len(batch)
+            self.stdout.write(f'Обработано постов: {rendered}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перерендерено постов: {rendered}'
+        ))
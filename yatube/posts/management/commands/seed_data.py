@@ -0,0 +1,233 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import feed
+from posts.bulk import bulk_create_with_pks
+from posts.cache import (bump_count_generation, bump_index_generation,
+                         bump_names_generation)
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+WORDS = (
+    'привет как дела сегодня вчера завтра погода город дом работа кот '
+    'собака книга фильм музыка море лес река гора дорога машина поезд '
+    'кофе чай утро вечер ночь день неделя год лето зима осень весна '
+    'друг семья школа проект код тест релиз баг фича пост лента группа'
+).split()
+
+
+def next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса рангов 1..count по закону Ципфа с показателем skew.
+
+    При skew = 0 распределение равномерное, чем больше skew, тем
+    сильнее выделяются первые ранги.
+    """
+    ranks = range(1, count + 1)
+    return list(accumulate(1 / rank ** skew for rank in ranks))
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками со степенными распределениями: '
+        'немного авторов-звёзд, длинный хвост групп, активные '
+        'комментаторы.'
+    )
+
+    def add_arguments(self, parser):
+        counts = (
+            ('users', 1000), ('groups', 50), ('posts', 100000),
+            ('comments', 300000), ('follows', 20000),
+        )
+        for name, default in counts:
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Сколько создать ({default} по умолчанию).',
+            )
+        skews = (
+            ('author', 'авторов постов'), ('group', 'групп'),
+            ('commenter', 'комментаторов'),
+            ('follow', 'авторов в подписках'),
+        )
+        for name, title in skews:
+            parser.add_argument(
+                f'--{name}-skew', type=float, default=1.1,
+                help=f'Показатель закона Ципфа для {title}; 0 — равномерно.',
+            )
+        parser.add_argument(
+            '--group-share', type=float, default=0.7,
+            help='Доля постов, опубликованных в группе.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней раскидать даты постов.',
+        )
+        parser.add_argument('--seed', type=int, help='Зерно генератора.')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько строк вставлять в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        users = self.create_users()
+        groups = self.create_groups()
+        self.create_follows(users)
+        posts = self.create_posts(users, groups)
+        self.create_comments(users, posts)
+        self.finish()
+
+    def insert(self, title, model, rows, total, after=None, date_field=None):
+        """Вставляет объекты из генератора пачками и печатает скорость.
+
+        Дата из date_field (поле с auto_now_add) сохраняется такой,
+        какой её задал генератор.
+        """
+        started = time.monotonic()
+        done = 0
+        while done < total:
+            size = min(self.batch_size, total - done)
+            batch = [next(rows) for _ in range(size)]
+            with transaction.atomic():
+                if date_field is None:
+                    model.objects.bulk_create(batch)
+                else:
+                    bulk_create_with_pks(model, batch, date_field)
+                if after is not None:
+                    after(batch)
+            done += len(batch)
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'{title}: {done}/{total}, {done / elapsed:.0f} строк/с'
+            )
+
+    def create_users(self):
+        first = next_pk(User)
+        count = self.options['users']
+        password = make_password(None)
+        self.insert('Пользователи', User, (
+            User(pk=pk, username=f'seed{pk}', first_name='Автор',
+                 last_name=str(pk), password=password)
+            for pk in range(first, first + count)
+        ), count)
+        self.insert('Счётчики', UserStats, (
+            UserStats(user_id=pk) for pk in range(first, first + count)
+        ), count)
+        return range(first, first + count)
+
+    def create_groups(self):
+        first = next_pk(Group)
+        count = self.options['groups']
+        self.insert('Группы', Group, (
+            Group(pk=pk, title=f'Группа {pk}', slug=f'seed-group-{pk}',
+                  description=self.text())
+            for pk in range(first, first + count)
+        ), count)
+        return range(first, first + count)
+
+    def create_follows(self, users):
+        count = min(self.options['follows'], len(users) * (len(users) - 1))
+        authors = self.sampler(users, self.options['follow_skew'])
+        pairs = set()
+
+        def follows():
+            while True:
+                user_id = self.random.choice(users)
+                author_id = authors()
+                if user_id != author_id and (user_id, author_id) not in pairs:
+                    pairs.add((user_id, author_id))
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.insert('Подписки', Follow, follows(), count)
+
+    def create_posts(self, users, groups):
+        first = next_pk(Post)
+        count = self.options['posts'] if users else 0
+        authors = self.sampler(users, self.options['author_skew'])
+        in_group = self.sampler(groups, self.options['group_skew'])
+        share = self.options['group_share'] if groups else 0
+        rows = (
+            self.post(pk=pk, text=self.text(), author_id=authors(),
+                      group_id=in_group() if self.random.random() < share
+                      else None,
+                      pub_date=self.post_date(pk - first, count))
+            for pk in range(first, first + count)
+        )
+        self.insert('Посты', Post, rows, count, feed.fan_out_posts,
+                    date_field='pub_date')
+        return first, count
+
+    def create_comments(self, users, posts):
+        first, posts_count = posts
+        count = self.options['comments'] if users and posts_count else 0
+        commenters = self.sampler(users, self.options['commenter_skew'])
+
+        def comments():
+            while True:
+                index = self.random.randrange(posts_count)
+                published = self.post_date(index, posts_count)
+                delay = timedelta(hours=self.random.expovariate(1 / 12))
+                yield Comment(
+                    post_id=first + index, author_id=commenters(),
+                    text=self.text(),
+                    created=min(published + delay, self.now),
+                )
+
+        self.insert('Комментарии', Comment, comments(), count,
+                    date_field='created')
+
+    def finish(self):
+        models = [User, Group, Post, Comment, Follow, UserStats]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        call_command('reconcile_counters', stdout=self.stdout)
+        bump_index_generation()
+        bump_count_generation()
+        bump_names_generation()
+
+    def sampler(self, population, skew):
+        """Функция, которая выбирает элемент population по Ципфу.
+
+        Ранги у каждого распределения свои: самые читаемые авторы не
+        обязательно пишут больше всех, иначе ленты их подписчиков
+        растут как произведение двух степенных законов.
+        """
+        if not population:
+            return lambda: None
+        population = list(population)
+        self.random.shuffle(population)
+        weights = zipf_weights(len(population), skew)
+        return lambda: self.random.choices(population, cum_weights=weights)[0]
+
+    def post(self, **fields):
+        post = Post(**fields)
+        post.render_text()
+        return post
+
+    def post_date(self, index, count):
+        # Даты растут вместе с id, как у настоящих постов; по дате поста
+        # комментарий получает время не раньше публикации.
+        span = (self.now - self.start) / max(count, 1)
+        return self.start + span * index
+
+    def text(self):
+        words = self.random.choices(WORDS, k=self.random.randint(5, 60))
+        return ' '.join(words)
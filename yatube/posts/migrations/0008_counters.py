@@ -0,0 +1,67 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Счётчики заполняются теми же подсчётами, что и в reconcile_counters,
+# иначе до его ручного запуска у всех профилей были бы нули. Повторные
+# подписки не считаются: их удаляет следующая миграция.
+BACKFILL_SQL = [
+    """
+    INSERT INTO posts_userstats
+        (user_id, posts_count, followers_count, following_count)
+    SELECT users.{pk},
+        (SELECT COUNT(*) FROM posts_post WHERE author_id = users.{pk}),
+        (SELECT COUNT(DISTINCT user_id) FROM posts_follow
+         WHERE author_id = users.{pk}),
+        (SELECT COUNT(DISTINCT author_id) FROM posts_follow
+         WHERE user_id = users.{pk})
+    FROM {users} users
+    """,
+    """
+    UPDATE posts_post SET comments_count = (
+        SELECT COUNT(*) FROM posts_comment
+        WHERE posts_comment.post_id = posts_post.id
+    )
+    """,
+]
+
+
+def backfill(apps, schema_editor):
+    user_meta = apps.get_model(settings.AUTH_USER_MODEL)._meta
+    for statement in BACKFILL_SQL:
+        schema_editor.execute(statement.format(
+            users=schema_editor.quote_name(user_meta.db_table),
+            pk=schema_editor.quote_name(user_meta.pk.column),
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:34
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+fts = import_module('posts.migrations.0010_post_fts')
+
+# SQLite добавляет и удаляет столбцы, пересоздавая таблицу, и вместе со
+# старой таблицей пропадают триггеры полнотекстового индекса.
+TRIGGERS_SQL = [sql for sql in fts.CREATE_SQL if 'CREATE TRIGGER' in sql]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, fts.run(TRIGGERS_SQL)
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(
+            fts.run(TRIGGERS_SQL), migrations.RunPython.noop
+        ),
+    ]
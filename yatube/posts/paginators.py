@@ -0,0 +1,241 @@
+import base64
+import binascii
+import hashlib
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.cache.stampede import get_or_compute
+
+from .cache import count_generation
+
+NEXT = 'n'
+PREVIOUS = 'p'
+ELLIPSIS = '…'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_position(direction, date, pk):
+    raw = f'{direction}|{date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(obj, direction=NEXT, date_field='pub_date'):
+    """Кодирует позицию объекта (дата, id) в строку для URL."""
+    return encode_position(direction, getattr(obj, date_field), obj.pk)
+
+
+def decode_cursor(cursor):
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if direction not in (NEXT, PREVIOUS) or pub_date is None:
+        raise InvalidCursor(cursor)
+    # Больше 64 бит SQLite не примет: запрос упал бы с OverflowError.
+    if pk <= 0 or pk >= 2 ** 63:
+        raise InvalidCursor(cursor)
+    return direction, pub_date, pk
+
+
+def reverse_cursor(cursor):
+    """Курсор от той же позиции, но в обратную сторону."""
+    direction, pub_date, pk = decode_cursor(cursor)
+    return encode_position(
+        PREVIOUS if direction == NEXT else NEXT, pub_date, pk
+    )
+
+
+class CursorPage(Page):
+    """Страница, полученная по курсору, без COUNT(*) и OFFSET."""
+
+    def __init__(self, object_list, paginator, cursor,
+                 has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Page cursor={self.cursor}>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который не считает COUNT(*) на каждый запрос.
+
+    Число объектов кэшируется по тексту запроса до ближайшей записи
+    в посты или подписки. Считается не больше PAGINATOR_MAX_COUNT строк:
+    для больших выборок число приблизительное, последние страницы
+    доступны через курсор.
+    """
+
+    ELLIPSIS = ELLIPSIS
+    count_is_approximate = False
+
+    @cached_property
+    def count(self):
+        query = str(self.object_list.query).encode()
+        key = 'posts:count:{}:{}'.format(
+            count_generation(), hashlib.md5(query).hexdigest()
+        )
+        count, self.count_is_approximate = get_or_compute(
+            key, self._count, settings.PAGINATOR_COUNT_CACHE_TIMEOUT
+        )
+        return count
+
+    def _count(self):
+        max_count = settings.PAGINATOR_MAX_COUNT
+        count = self.object_list.order_by().values('pk')[
+            :max_count + 1
+        ].count()
+        return min(count, max_count), count > max_count
+
+    def page_has_next(self, page):
+        if page.has_next():
+            return True
+        return self.count_is_approximate and len(page) == self.per_page
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей с многоточиями вместо пропусков."""
+        number = self.validate_number(number)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+
+class CursorPaginator(CachedCountPaginator):
+    """Paginator, который умеет отдавать страницы по курсору (pub_date, id).
+
+    Обычный get_page() по номеру страницы продолжает работать, а
+    get_cursor_page() читает ровно per_page + 1 строк по индексу,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    key_fields задают поля сортировки в queryset, если они называются
+    иначе, чем pub_date и id у постов на странице.
+    """
+
+    def __init__(self, object_list, per_page,
+                 key_fields=('pub_date', 'id'), **kwargs):
+        self.key_fields = key_fields
+        object_list = object_list.order_by(
+            *(f'-{field}' for field in key_fields)
+        )
+        super().__init__(object_list, per_page, **kwargs)
+
+    def _get_objects(self, object_list):
+        return object_list
+
+    def _get_page(self, object_list, *args, **kwargs):
+        return super()._get_page(
+            self._get_objects(object_list), *args, **kwargs
+        )
+
+    def _key_filter(self, lookup, pub_date, pk):
+        # Условие date <= X вынесено отдельно, чтобы SQLite использовал
+        # его как диапазон по составному индексу, а не сканировал таблицу.
+        date_field, pk_field = self.key_fields
+        inclusive = {'lt': 'lte', 'gt': 'gte'}[lookup]
+        return Q(**{f'{date_field}__{inclusive}': pub_date}) & (
+            Q(**{f'{date_field}__{lookup}': pub_date})
+            | Q(**{f'{pk_field}__{lookup}': pk})
+        )
+
+    def get_cursor_page(self, cursor):
+        """Страница после или перед курсором; без курсора — первая."""
+        per_page = self.per_page
+        if not cursor:
+            object_list = list(self.object_list[:per_page + 1])
+            return CursorPage(
+                self._get_objects(object_list[:per_page]), self, cursor,
+                len(object_list) > per_page, False
+            )
+        try:
+            direction, pub_date, pk = decode_cursor(cursor)
+        except InvalidCursor:
+            return self.get_page(1)
+        # Перед позицией курсора «вперёд» посты есть всегда, даже если
+        # после неё уже пусто; с курсором «назад» — наоборот.
+        if direction == NEXT:
+            object_list = list(self.object_list.filter(
+                self._key_filter('lt', pub_date, pk)
+            )[:per_page + 1])
+            has_next = len(object_list) > per_page
+            has_previous = True
+            object_list = object_list[:per_page]
+        else:
+            object_list = list(self.object_list.reverse().filter(
+                self._key_filter('gt', pub_date, pk)
+            )[:per_page + 1])
+            has_next = True
+            has_previous = len(object_list) > per_page
+            object_list = object_list[:per_page][::-1]
+        return CursorPage(
+            self._get_objects(object_list), self, cursor,
+            has_next, has_previous
+        )
+
+
+class FeedPaginator(CursorPaginator):
+    """Листает FeedEntry ленты подписок, а на страницу отдаёт посты."""
+
+    def __init__(self, object_list, per_page, **kwargs):
+        kwargs.setdefault('key_fields', ('pub_date', 'post_id'))
+        object_list = object_list.select_related(
+            'post__author', 'post__group'
+        )
+        super().__init__(object_list, per_page, **kwargs)
+
+    def _get_objects(self, object_list):
+        return [entry.post for entry in object_list]
+
+
+def get_comments_batch(comments, cursor, per_page):
+    """Очередная пачка комментариев по возрастанию (created, id).
+
+    Возвращает список комментариев с подтянутыми авторами и курсор
+    следующей пачки (пустая строка, если комментариев больше нет).
+    """
+    comments = comments.select_related('author').order_by('created', 'id')
+    if cursor:
+        try:
+            _, created, pk = decode_cursor(cursor)
+        except InvalidCursor:
+            pass
+        else:
+            comments = comments.filter(
+                Q(created__gte=created) & (Q(created__gt=created)
+                                           | Q(id__gt=pk))
+            )
+    batch = list(comments[:per_page + 1])
+    if len(batch) <= per_page:
+        return batch, ''
+    batch = batch[:per_page]
+    return batch, encode_cursor(batch[-1], date_field='created')
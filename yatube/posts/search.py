@@ -0,0 +1,51 @@
+from django.db import connection
+
+# Маркеры подсветки из snippet(): текст экранируется уже после выборки,
+# поэтому вместо HTML-тегов используются управляющие символы.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    """Превращает пользовательский ввод в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки и ищется по префиксу, слова
+    объединяются через AND, операторы FTS5 из ввода не выполняются.
+    """
+    terms = ['"{}"*'.format(word.replace('"', '""'))
+             for word in query.split()]
+    return ' '.join(terms)
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset постов только найденные по тексту."""
+    if not fts_available():
+        return queryset.filter(text__icontains=query)
+    return queryset.extra(
+        where=['posts_post.id IN (SELECT rowid FROM posts_post_fts '
+               'WHERE posts_post_fts MATCH %s)'],
+        params=[build_match(query)],
+    )
+
+
+def search_posts(queryset, query):
+    """Найденные посты по убыванию релевантности со сниппетом текста."""
+    if not fts_available():
+        return filter_posts(queryset, query).extra(
+            select={'snippet': 'posts_post.text'}
+        ).order_by('-pub_date')
+    return queryset.extra(
+        select={
+            'snippet': "snippet(posts_post_fts, 0, %s, %s, '…', 16)",
+        },
+        select_params=[MARK_START, MARK_END],
+        tables=['posts_post_fts'],
+        where=['posts_post_fts.rowid = posts_post.id',
+               'posts_post_fts MATCH %s'],
+        params=[build_match(query)],
+        order_by=['posts_post_fts.rank'],
+    )
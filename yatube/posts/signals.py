@@ -0,0 +1,125 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed
+from .cache import (bump_comments_generation, bump_count_generation,
+                    bump_index_generation, bump_names_generation,
+                    bump_object_generation)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.fan_out_post(instance)
+        counters.change_user_stat(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stat(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+        counters.change_user_stat(instance.user_id, 'following_count', 1)
+        counters.change_user_stat(
+            instance.author_id, 'followers_count', 1
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.purge(instance.user_id, instance.author_id)
+    counters.change_user_stat(instance.user_id, 'following_count', -1)
+    counters.change_user_stat(instance.author_id, 'followers_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def index_page_changed(sender, **kwargs):
+    bump_index_generation()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login, лента от этого
+    # не меняется.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_index_generation()
+    bump_names_generation()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def post_counts_changed(sender, **kwargs):
+    bump_count_generation()
+
+
+@receiver(pre_save, sender=Post)
+def post_group_remembered(sender, instance, raw=False, **kwargs):
+    # При переносе поста в другую группу меняется и страница старой.
+    if instance.pk is None or raw:
+        return
+    instance._previous_group_id = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, **kwargs):
+    bump_object_generation('post', instance.pk)
+    bump_object_generation('author', instance.author_id)
+    bump_object_generation('group', instance.group_id)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        bump_object_generation('group', previous_group_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, **kwargs):
+    bump_object_generation('post', instance.post_id)
+    bump_comments_generation()
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_pages_changed(sender, instance, **kwargs):
+    bump_object_generation('author', instance.author_id)
+    bump_object_generation('author', instance.user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def names_changed(sender, instance, **kwargs):
+    if sender is Group:
+        bump_object_generation('group', instance.pk)
+    bump_names_generation()
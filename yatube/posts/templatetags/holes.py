@@ -0,0 +1,15 @@
+from django import template
+
+from .. import fragments
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **kwargs):
+    """Личный фрагмент страницы, см. posts.fragments.
+
+    Аргументы фрагмента попадают в кэшируемую страницу, поэтому это
+    должны быть простые значения (id, имена), а не объекты.
+    """
+    return fragments.punch(context.request, name, **kwargs)
@@ -0,0 +1,31 @@
+from django import template
+
+from ..paginators import NEXT, PREVIOUS, encode_cursor, reverse_cursor
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor(page):
+    """Курсор страницы после последнего поста текущей."""
+    if not page.paginator.page_has_next(page):
+        return ''
+    if not len(page):
+        return reverse_cursor(page.cursor)
+    return encode_cursor(page[len(page) - 1], NEXT)
+
+
+@register.filter
+def previous_cursor(page):
+    """Курсор страницы перед первым постом текущей."""
+    if not page.has_previous():
+        return ''
+    if not len(page):
+        return reverse_cursor(page.cursor)
+    return encode_cursor(page[0], PREVIOUS)
+
+
+@register.filter
+def page_window(page):
+    """Номера страниц вокруг текущей, пропуски заменены на многоточие."""
+    return page.paginator.get_elided_page_range(page.number)
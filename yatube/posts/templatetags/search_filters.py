@@ -0,0 +1,14 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from ..search import MARK_END, MARK_START
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    """Экранирует сниппет и подсвечивает найденные слова тегом mark."""
+    html = escape(snippet).replace(MARK_START, '<mark>')
+    return mark_safe(html.replace(MARK_END, '</mark>'))
@@ -0,0 +1,33 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from ..management.commands.benchmark_views import Command, percentile
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    def compare(self, previous, current):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump({'results': [previous]}, file)
+            file.flush()
+            command = Command(stdout=StringIO())
+            command.options = {'threshold': 20}
+            command.compare(file.name, [current])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_regressions_are_flagged(self):
+        previous = {'view': 'index', 'size': 100, 'p95_ms': 10,
+                    'queries': 4}
+        self.compare(previous, dict(previous, p95_ms=11.5))
+        with self.assertRaisesMessage(CommandError, 'p95 10.0 → 13.0'):
+            self.compare(previous, dict(previous, p95_ms=13))
+        with self.assertRaisesMessage(CommandError, 'запросов 4 → 5'):
+            self.compare(previous, dict(previous, queries=5))
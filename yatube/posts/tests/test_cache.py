@@ -0,0 +1,258 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import request_started
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core.cache.sqlite import SQLiteCache
+from core.cache.stampede import Entry, get_or_compute
+from core.cache.tiered import TieredCache
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class TestEnvironmentTests(SimpleTestCase):
+    def test_site_cache_not_used(self):
+        """Тесты не пишут в кэш работающего сайта."""
+        site_cache = os.path.join(settings.BASE_DIR, 'cache.sqlite3')
+        self.assertNotEqual(settings.CACHES['shared']['LOCATION'],
+                            site_cache)
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_get_set_many(self):
+        self.cache.set('one', {'a': 1})
+        self.cache.set_many({'two': 2, 'three': [3]})
+        self.assertEqual(self.cache.get('one'), {'a': 1})
+        self.assertEqual(
+            self.cache.get_many(['one', 'two', 'three', 'missing']),
+            {'one': {'a': 1}, 'two': 2, 'three': [3]},
+        )
+        self.cache.delete_many(['one', 'two'])
+        self.assertEqual(self.cache.get_many(['one', 'two', 'three']),
+                         {'three': [3]})
+        self.assertEqual(self.cache.get('one', 'default'), 'default')
+
+    def test_timeouts_and_add(self):
+        self.cache.set('gone', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('gone'))
+        self.assertTrue(self.cache.add('gone', 2))
+        self.assertFalse(self.cache.add('gone', 3))
+        self.assertEqual(self.cache.get('gone'), 2)
+        self.cache.set('forever', 1, timeout=None)
+        self.assertTrue(self.cache.has_key('forever'))
+        self.assertTrue(self.cache.touch('forever', -1))
+        self.assertFalse(self.cache.has_key('forever'))
+
+    def test_visible_to_other_instances(self):
+        self.cache.set('shared', 'значение')
+        other = self.make_cache()
+        self.assertEqual(other.get('shared'), 'значение')
+        other.clear()
+        self.assertIsNone(self.cache.get('shared'))
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+        self.assertEqual(self.cache.decr('counter', 10), 190)
+
+    def test_least_recently_used_are_evicted(self):
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache._connection.execute('UPDATE cache SET accessed = accessed - 10')
+        # Чтение делает «a» самой свежей записью, вытесняется «b».
+        cache.get('a')
+        cache.set('d', 'd')
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']),
+                         {'a': 'a', 'c': 'c', 'd': 'd'})
+
+    def test_size_cap(self):
+        cache = self.make_cache(MAX_BYTES=10000)
+        for i in range(10):
+            cache.set(f'big{i}', 'x' * 3000)
+        entries, size = cache._connection.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+        self.assertLessEqual(size, 10000)
+        self.assertEqual(len(cache.get_many(
+            [f'big{i}' for i in range(10)]
+        )), entries)
+        self.assertIsNotNone(cache.get('big9'))
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'l2': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-l2',
+    },
+})
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['l2'].clear()
+        self.worker = self.make_worker('first')
+        self.other = self.make_worker('second')
+
+    def make_worker(self, name, **options):
+        # У каждого «воркера» свой L1, как у разных процессов.
+        cache = TieredCache('l2', {'NAME': name, 'OPTIONS': options})
+        cache._store.clear()
+        cache._store.checked = False
+        return cache
+
+    def test_hot_keys_served_from_l1(self):
+        self.worker.set('post', {'text': 'пост'})
+        caches['l2'].delete('post')
+        value = self.worker.get('post')
+        self.assertEqual(value, {'text': 'пост'})
+        self.assertIs(self.worker.get_many(['post'])['post'], value)
+
+    def test_responses_copied(self):
+        """Ответ из L1 можно дописывать, как это делают middleware."""
+        response = HttpResponse('страница')
+        response['ETag'] = '"1"'
+        self.worker.set('page', (response, {'generation': 1}))
+        response.content = 'изменена после записи'
+        cached, generations = self.worker.get('page')
+        self.assertEqual(generations, {'generation': 1})
+        cached['ETag'] = '"2"'
+        cached.content = 'дорисована'
+        cached, _ = self.worker.get('page')
+        self.assertEqual(cached.content.decode(), 'страница')
+        self.assertEqual(cached['ETag'], '"1"')
+
+    def test_generation_bump_reaches_other_workers(self):
+        self.worker.set('generation', 1)
+        self.assertEqual(self.other.get('generation'), 1)
+        self.worker.incr('generation')
+        self.assertEqual(self.worker.get('generation'), 2)
+        request_started.send(sender=self.__class__)
+        self.assertEqual(self.other.get('generation'), 2)
+        self.worker.delete('generation')
+        request_started.send(sender=self.__class__)
+        self.assertIsNone(self.other.get('generation'))
+
+    def test_generation_bump_keeps_hot_keys(self):
+        self.other.set('card', 'карточка')
+        self.worker.set('generation', 1)
+        self.assertEqual(self.other.get('generation'), 1)
+        self.worker.incr('generation')
+        caches['l2'].delete('card')
+        request_started.send(sender=self.__class__)
+        self.assertEqual(self.other.get('generation'), 2)
+        self.assertEqual(self.other.get('card'), 'карточка')
+
+    def test_l1_entries_expire(self):
+        worker = self.make_worker('short', L1_TIMEOUT=0.05)
+        worker.set('key', 'старое')
+        caches['l2'].set('key', 'новое')
+        self.assertEqual(worker.get('key'), 'старое')
+        time.sleep(0.06)
+        self.assertEqual(worker.get('key'), 'новое')
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stampede',
+    },
+})
+class StampedeTests(SimpleTestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.calls = 0
+
+    def compute(self, delay=0):
+        self.calls += 1
+        time.sleep(delay)
+        return f'значение {self.calls}'
+
+    def test_single_flight(self):
+        results = []
+
+        def request():
+            results.append(get_or_compute('key', lambda: self.compute(0.2),
+                                          60))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ['значение 1'] * 5)
+
+    def test_stale_served_while_revalidating(self):
+        cache = caches['default']
+        cache.set('key', Entry('старое', 0.1, time.time() - 1))
+        cache.add('key:lock', True)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'старое')
+        self.assertEqual(self.calls, 0)
+        cache.delete('key:lock')
+        self.assertEqual(get_or_compute('key', self.compute, 60),
+                         'значение 1')
+        self.assertEqual(get_or_compute('key', self.compute, 60),
+                         'значение 1')
+
+    def test_early_recompute_near_expiry(self):
+        cache = caches['default']
+        # Считается долго и истекает через секунду: значение
+        # пересчитывается раньше срока.
+        cache.set('key', Entry('старое', 100, time.time() + 1))
+        with mock.patch('random.random', return_value=0.5):
+            self.assertEqual(get_or_compute('key', self.compute, 60),
+                             'значение 1')
+        cache.set('key', Entry('свежее', 0.001, time.time() + 60))
+        with mock.patch('random.random', return_value=0.5):
+            self.assertEqual(get_or_compute('key', self.compute, 60),
+                             'свежее')
+
+    def test_guarded_cache_tag(self):
+        template = Template(
+            '{% load guarded_cache %}'
+            '{% guarded_cache 60 fragment name %}{{ value }}'
+            '{% endguarded_cache %}'
+        )
+        first = template.render(Context({'name': 'a', 'value': 1}))
+        second = template.render(Context({'name': 'a', 'value': 2}))
+        other = template.render(Context({'name': 'b', 'value': 3}))
+        self.assertEqual((first, second, other), ('1', '1', '3'))
@@ -6,6 +6,8 @@ from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
 
 from ..models import Comment, Group, Post
 
@@ -78,6 +80,31 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count + 1)
         self.checkbox_for_edit_and_create(form_data, image_name)
 
+    @override_settings(POST_THUMBNAIL_WORKERS=0)
+    def test_create_post_generates_thumbnails(self):
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'пост с картинкой', 'image': uploaded},
+        )
+        source = ImageFile(Post.objects.latest('id').image)
+        thumbnails = default.kvstore._get(source.key, identity='thumbnails')
+        self.assertEqual(
+            len(thumbnails), len(settings.POST_THUMBNAIL_GEOMETRIES)
+        )
+
     def test_edit_post(self):
         post = Post.objects.create(
             text='Привет, как дела?',
@@ -0,0 +1,109 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import NotSupportedError, connection
+from django.test import TestCase
+
+from .. import bulk
+from ..models import Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Импорт', slug='import')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def run_import(self, kind, name, content, **options):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_content', kind, path, stdout=stdout,
+                     stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_posts_jsonl(self):
+        rows = [
+            {'author': 'writer', 'text': 'первый', 'group': 'import',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'author': 'writer', 'text': 'второй'},
+            {'author': 'nobody', 'text': 'без автора'},
+            {'author': 'writer', 'text': ''},
+            {'author': 'writer', 'text': 'чужая группа', 'group': 'nope'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nbroken\n'
+        stdout, stderr = self.run_import(
+            'posts', 'posts.jsonl', content, batch_size=2
+        )
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('text', flat=True)),
+            ['первый', 'второй'],
+        )
+        first = Post.objects.get(text='первый')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 2)
+        self.assertIn('Строка 3: Нет пользователя «nobody».', stderr)
+        self.assertIn('Строка 6: Строка не разобрана.', stderr)
+        self.assertIn('создано: 2', stdout)
+        self.assertIn('с ошибками: 4', stdout)
+
+    def test_import_comments_csv(self):
+        post = Post.objects.create(text='пост', author=self.author)
+        content = (
+            'post,author,text,created\n'
+            f'{post.pk},reader,отлично,2021-05-06T07:08:09\n'
+            f'{post.pk},reader,,\n'
+            '100500,reader,мимо,\n'
+        )
+        _, stderr = self.run_import('comments', 'comments.csv', content)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.text, 'отлично')
+        self.assertEqual(comment.created.year, 2021)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertIn('Строка 3: Обязательное поле.', stderr)
+        self.assertIn('Строка 4: Нет поста 100500.', stderr)
+
+    def test_import_follows_skips_existing(self):
+        Post.objects.create(text='пост читателя', author=self.reader)
+        content = (
+            'user,author\n'
+            'reader,writer\n'
+            'writer,reader\n'
+            'writer,reader\n'
+            'writer,writer\n'
+        )
+        stdout, stderr = self.run_import('follows', 'follows.csv', content)
+        self.assertEqual(Follow.objects.count(), 2)
+        self.assertEqual(FeedEntry.objects.filter(user=self.author).count(), 1)
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.reader.stats.followers_count, 1)
+        self.assertIn('пропущено: 2', stdout)
+        self.assertIn('Нельзя подписаться на самого себя.', stderr)
+
+    def test_pks_read_back_only_on_sqlite(self):
+        """На базах без RETURNING последние строки могут быть чужими."""
+        posts = [Post(text='пост', author=self.author)]
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            with self.assertRaises(NotSupportedError):
+                bulk.bulk_create_with_pks(Post, posts, 'pub_date')
+        self.assertFalse(Post.objects.exists())
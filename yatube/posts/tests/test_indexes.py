@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..templatetags.pagination import next_cursor, previous_cursor
+
+User = get_user_model()
+
+
+class FeedQueryPlanTests(TestCase):
+    """Запросы лент должны идти по индексам, без полного скана и сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(25):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='к')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed_urls(self):
+        return [
+            reverse('posts:main_page'),
+            reverse('posts:posts_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        ]
+
+    def assert_indexed(self, queries):
+        for query in queries:
+            sql = query['sql']
+            if 'posts_' not in sql or not sql.startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            with self.subTest(sql=sql):
+                for step in plan:
+                    self.assertNotIn('TEMP B-TREE', step)
+                    if step.startswith('SCAN') and 'subquery' not in step:
+                        self.assertIn('INDEX', step)
+
+    def test_feed_pages_use_indexes(self):
+        for url in self.feed_urls():
+            with CaptureQueriesContext(connection) as context:
+                page = self.client.get(url + '?page=2').context['page_obj']
+                self.client.get(url + '?cursor=' + next_cursor(page))
+                self.client.get(url + '?cursor=' + previous_cursor(page))
+            self.assert_indexed(context.captured_queries)
+
+    def test_post_detail_and_follow_use_indexes(self):
+        urls = [
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:profile_follow', kwargs={'username': self.author}),
+        ]
+        for url in urls:
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(url)
+            self.assert_indexed(context.captured_queries)
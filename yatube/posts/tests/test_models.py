@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..cache import get_generations, object_generation_key
+from ..models import Comment, FeedEntry, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -27,6 +31,23 @@ class PostModelTest(TestCase):
         expected_text = post.text[:15]
         self.assertEqual(expected_text, str(post))
 
+    def test_text_html_rendered_on_save(self):
+        post = Post.objects.create(author=self.user, text='<b>раз</b>\nдва')
+        expected = '&lt;b&gt;раз&lt;/b&gt;<br>два'
+        self.assertEqual(post.text_html, expected)
+        post.text = 'три'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'три')
+
+    def test_render_post_text_backfills_old_posts(self):
+        Post.objects.update(text_html='')
+        old = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(old.html, 'Текст точно больше 15 символов')
+        call_command('render_post_text', batch_size=1, stdout=StringIO())
+        old.refresh_from_db()
+        self.assertEqual(old.text_html, 'Текст точно больше 15 символов')
+
 
 class GroupModelTest(TestCase):
     @classmethod
@@ -43,3 +64,77 @@ class GroupModelTest(TestCase):
         group = GroupModelTest.group
         expected_title = group.title
         self.assertEqual(expected_title, str(group))
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(UserStats.objects.get(user=self.author).posts_count,
+                         1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 0
+        )
+        post.delete()
+        self.assertEqual(UserStats.objects.get(user=self.author).posts_count,
+                         0)
+
+    def test_reconcile_counters(self):
+        post = Post.objects.create(author=self.author, text='Текст')
+        Comment.objects.create(post=post, author=self.reader, text='к')
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        UserStats.objects.filter(user=self.reader).delete()
+        keys = [object_generation_key('post', post.pk),
+                object_generation_key('author', self.author.pk)]
+        before = get_generations(keys)
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        after = get_generations(keys)
+        for key in keys:
+            self.assertNotEqual(after[key], before[key])
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(UserStats.objects.get(user=self.author).posts_count,
+                         1)
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
+
+
+class FeedFanOutTest(TestCase):
+    def test_fan_out_to_many_followers(self):
+        """Пост попадает в ленты всех подписчиков, даже если их много.
+
+        В SQLite в одном INSERT может быть не больше 500 SELECT, а
+        подписчиков больше.
+        """
+        author = User.objects.create_user(username='star')
+        User.objects.bulk_create(
+            User(username=f'fan{i}') for i in range(600)
+        )
+        followers = User.objects.filter(username__startswith='fan')
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author) for user in followers
+        )
+        post = Post.objects.create(author=author, text='Всем привет')
+        self.assertEqual(FeedEntry.objects.filter(post=post).count(), 600)
@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware.queries import QueryBudgetExceeded, QueryRecorder
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class QueryBudgetTests(TestCase):
+    """Страницы укладываются в QUERY_BUDGETS при полной странице постов.
+
+    Посты разных авторов и групп: если шаблон начнёт ходить в базу за
+    каждым постом, middleware выбросит QueryBudgetExceeded.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        for i in range(12):
+            author = User.objects.create_user(username=f'author{i}',
+                                              first_name=f'Имя{i}')
+            group = Group.objects.create(title=f'Группа {i}',
+                                         slug=f'group-{i}')
+            cls.post = Post.objects.create(text=f'Пост {i}', author=author,
+                                           group=group)
+            Follow.objects.create(user=cls.reader, author=author)
+            Comment.objects.create(post=cls.post, author=author, text='к')
+        cls.group = group
+        cls.author = author
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_views_within_budget(self):
+        urls = [
+            reverse('posts:main_page'),
+            reverse('posts:posts_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+            reverse('posts:search') + '?q=Пост',
+            reverse('api:posts'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:profile_posts', kwargs={'username': self.author}),
+            reverse('api:follow_posts'),
+            reverse('api:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('X-Query-Count', response)
+
+    def test_budget_exceeded_raises(self):
+        with override_settings(QUERY_BUDGETS={'posts:main_page': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:main_page'))
+
+    def test_repeated_queries_point_to_template_line(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            render_to_string('posts/includes/comment_list.html', {
+                'post': self.post,
+                'comments': Comment.objects.all(),
+            })
+        repeated = recorder.repeated(threshold=3)
+        self.assertEqual(len(repeated), 1)
+        shape, count, locations = repeated[0]
+        self.assertIn('auth_user', shape)
+        self.assertEqual(count, 12)
+        self.assertEqual(locations, ['posts/includes/comment_list.html:5'])
@@ -0,0 +1,42 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase
+
+from ..models import Comment, FeedEntry, Follow, Group, Post, UserStats
+
+
+class SeedDataTest(TestCase):
+    def test_seed_data(self):
+        call_command(
+            'seed_data', users=30, groups=5, posts=300, comments=500,
+            follows=100, seed=1, batch_size=70, stdout=StringIO(),
+        )
+        self.assertEqual(UserStats.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 500)
+        self.assertEqual(Follow.objects.count(), 100)
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('posts_count'))['total'],
+            300,
+        )
+        self.assertEqual(
+            Post.objects.aggregate(total=Sum('comments_count'))['total'],
+            500,
+        )
+        expected_feed = sum(
+            Post.objects.filter(author_id=author_id).count()
+            for author_id in Follow.objects.values_list('author_id',
+                                                        flat=True)
+        )
+        self.assertEqual(FeedEntry.objects.count(), expected_feed)
+        self.assertFalse(
+            Comment.objects.filter(created__lt=F('post__pub_date')).exists()
+        )
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreater((max(dates) - min(dates)).days, 300)
+        # Самый плодовитый автор пишет заметно больше среднего.
+        top = UserStats.objects.order_by('-posts_count').first()
+        self.assertGreater(top.posts_count, 300 / 30 * 3)
@@ -1,16 +1,29 @@
+import csv
+import json
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
 
-from ..models import Comment, Follow, Group, Post
+from .. import cards, thumbnails
+from ..models import Comment, FeedEntry, Follow, Group, Post
+from ..paginators import (NEXT, CursorPaginator, encode_cursor,
+                          encode_position)
+from ..templatetags.pagination import next_cursor, previous_cursor
 
 User = get_user_model()
 
@@ -111,12 +124,27 @@ class PostsViewsTests(TestCase):
             group=PostsViewsTests.group,
         )
         response_1 = self.authorized_client.get(reverse('posts:main_page'))
-        new_post.delete()
+        # update() не шлёт сигналов, поэтому фрагмент остаётся в кэше.
+        Post.objects.filter(id=new_post.id).update(
+            text='мимо кэша', text_html='мимо кэша'
+        )
         response_2 = self.authorized_client.get(reverse('posts:main_page'))
         self.assertEqual(response_1.content, response_2.content)
         cache.clear()
         response_3 = self.authorized_client.get(reverse('posts:main_page'))
         self.assertNotEqual(response_2.content, response_3.content)
+        self.assertContains(response_3, 'мимо кэша')
+
+    def test_cache_invalidated_on_delete(self):
+        new_post = Post.objects.create(
+            text='куку',
+            author=PostsViewsTests.author,
+        )
+        response_1 = self.authorized_client.get(reverse('posts:main_page'))
+        new_post.delete()
+        response_2 = self.authorized_client.get(reverse('posts:main_page'))
+        self.assertNotEqual(response_1.content, response_2.content)
+        self.assertNotContains(response_2, 'куку')
 
     def test_following_yes(self):
         follow_count_begin = Follow.objects.count()
@@ -173,6 +201,41 @@ class PostsViewsTests(TestCase):
         response = self.not_followed_client.get(reverse('posts:follow_index'))
         self.assertEqual(len(response.context['page_obj']), 0)
 
+    def test_follow_feed_backfill_and_purge(self):
+        """Подписка добавляет старые посты автора в ленту, отписка убирает."""
+        post = Post.objects.create(
+            text='старый пост',
+            author=PostsViewsTests.following_author,
+        )
+        self.authorized_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': PostsViewsTests.following_author.username}
+        ))
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': PostsViewsTests.following_author.username}
+        ))
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_rebuild_feed(self):
+        Follow.objects.create(
+            user=PostsViewsTests.author,
+            author=PostsViewsTests.following_author
+        )
+        post = Post.objects.create(
+            text='к',
+            author=PostsViewsTests.following_author,
+        )
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feed', stdout=StringIO())
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(PostsViewsTests.author.id, post.id)]
+        )
+
     def test_post_correct_group(self):
         clear_group = Group.objects.create(
             title='Пустая группа',
@@ -244,6 +307,7 @@ class PaginatorViewsTest(TestCase):
             )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewsTest.author)
@@ -266,3 +330,522 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(
                     response_3.context['page_obj']), 3
                 )
+
+    def test_cursor_paginator(self):
+        """Страницы по курсору совпадают со страницами по номеру."""
+        url = reverse('posts:main_page')
+        first_page = self.client.get(url).context['page_obj']
+        second_page = self.client.get(url + '?page=2').context['page_obj']
+        next_page = self.client.get(
+            url + '?cursor=' + next_cursor(first_page)
+        ).context['page_obj']
+        self.assertEqual(list(next_page), list(second_page))
+        self.assertFalse(next_page.has_next())
+        self.assertTrue(next_page.has_previous())
+        previous_page = self.client.get(
+            url + '?cursor=' + previous_cursor(next_page)
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertFalse(previous_page.has_previous())
+
+    def test_empty_cursor_page_links_back(self):
+        """С пустой страницы за концом ленты можно вернуться назад."""
+        url = reverse('posts:main_page')
+        first_page = self.client.get(url).context['page_obj']
+        last_page = self.client.get(
+            url + '?cursor=' + next_cursor(first_page)
+        ).context['page_obj']
+        response = self.client.get(
+            url + '?cursor=' + encode_cursor(last_page[len(last_page) - 1])
+        )
+        empty_page = response.context['page_obj']
+        self.assertEqual(len(empty_page), 0)
+        self.assertTrue(empty_page.has_previous())
+        self.assertContains(response, 'Предыдущая')
+        previous_page = self.client.get(
+            url + '?cursor=' + previous_cursor(empty_page)
+        ).context['page_obj']
+        # Назад — посты новее последнего, сам он на следующей странице.
+        self.assertEqual(len(previous_page), 10)
+        self.assertEqual(list(previous_page)[-2:], list(last_page)[:2])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse('posts:main_page') + '?cursor=broken'
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_cursor_pk_out_of_range(self):
+        for pk in (0, 2 ** 63, 10 ** 30):
+            cursor = encode_position(NEXT, timezone.now(), pk)
+            with self.subTest(pk=pk):
+                response = self.client.get(
+                    reverse('posts:main_page') + '?cursor=' + cursor
+                )
+                self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_paginator_count_is_cached(self):
+        url = reverse('posts:posts_list',
+                      kwargs={'slug': PaginatorViewsTest.group.slug})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url + '?page=2')
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ))
+        Post.objects.create(text='новый', author=PaginatorViewsTest.author,
+                            group=PaginatorViewsTest.group)
+        response = self.client.get(url + '?page=2')
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+
+    @override_settings(PAGINATOR_MAX_COUNT=10)
+    def test_paginator_count_is_approximate(self):
+        cache.clear()
+        response = self.client.get(reverse('posts:main_page'))
+        paginator = response.context['page_obj'].paginator
+        self.assertTrue(paginator.count_is_approximate)
+        self.assertEqual(paginator.count, 10)
+        self.assertContains(response, 'Следующая')
+        self.assertNotContains(response, 'Последняя')
+
+    def test_elided_page_range(self):
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(7)),
+            [1, '…', 5, 6, 7, 8, 9, '…', 13]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, '…', 13]
+        )
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='searcher')
+        cls.post = Post.objects.create(
+            text='Пишу про <b>котиков</b> и собак', author=cls.author
+        )
+        Post.objects.create(text='Совсем другая запись', author=cls.author)
+
+    def test_search_finds_post_by_prefix(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'котик'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        self.assertContains(response, '<mark>котиков</mark>')
+        self.assertNotContains(response, '<b>')
+
+    def test_search_follows_edits(self):
+        self.post.text = 'Теперь про попугаев'
+        self.post.save()
+        response = self.client.get(reverse('posts:search'), {'q': 'котик'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': 'попугаев'})
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_search_query_syntax_is_escaped(self):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': '"котик AND ( NEAR'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailBatchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='painter')
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        cls.small_gif = small_gif
+        cls.groups = {}
+        for size in (2, 10):
+            group = Group.objects.create(title=f'Группа {size}',
+                                         slug=f'group-{size}')
+            for i in range(size):
+                post = Post.objects.create(
+                    text='картинка', author=cls.author, group=group,
+                    image=SimpleUploadedFile(f'pic{size}-{i}.gif',
+                                             small_gif, 'image/gif')
+                )
+                thumbnails.generate(post.image.name)
+            cls.groups[size] = group
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def kvstore_queries(self, group):
+        cache.clear()
+        url = reverse('posts:posts_list', kwargs={'slug': group.slug})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertContains(response, '/media/cache/')
+        return [query for query in context.captured_queries
+                if 'thumbnail_kvstore' in query['sql']]
+
+    def test_names_match_sorl(self):
+        """thumbnail_name() и resolve_urls() совпадают с get_thumbnail()."""
+        post = Post.objects.filter(group=self.groups[2]).first()
+        for geometry, options in settings.POST_THUMBNAIL_GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                expected = get_thumbnail(post.image.name, geometry,
+                                         **options)
+                self.assertEqual(
+                    thumbnails.thumbnail_name(post.image.name, geometry,
+                                              options),
+                    expected.name,
+                )
+                self.assertEqual(thumbnails.resolve_urls([post], geometry),
+                                 {post.pk: expected.url})
+
+    def test_missing_thumbnail_generated_outside_request(self):
+        cache.clear()
+        post = Post.objects.create(
+            text='без миниатюры', author=self.author,
+            image=SimpleUploadedFile('raw.gif', self.small_gif, 'image/gif')
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        with override_settings(POST_THUMBNAIL_WORKERS=2), \
+                mock.patch.object(thumbnails, 'get_executor') as executor:
+            for _ in range(2):
+                response = self.client.get(url)
+                self.assertContains(response, post.image.url)
+        executor.return_value.submit.assert_called_once_with(
+            thumbnails.generate_in_worker, post.image.name
+        )
+        thumbnails.generate(post.image.name)
+        response = self.client.get(url)
+        self.assertNotContains(response, post.image.url)
+        self.assertContains(response, '/media/cache/')
+
+    def test_thumbnails_resolved_in_one_query(self):
+        """Число запросов к KV-хранилищу не зависит от размера страницы."""
+        for size, group in self.groups.items():
+            with self.subTest(size=size):
+                self.assertEqual(len(self.kvstore_queries(group)), 1)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='carded', first_name='Старое', last_name='Имя'
+        )
+        cls.group = Group.objects.create(title='Карточки', slug='cards')
+        cls.posts = [
+            Post.objects.create(text=f'карточка {i}', author=cls.author,
+                                group=cls.group)
+            for i in range(3)
+        ]
+        cls.group_url = reverse(
+            'posts:posts_list', kwargs={'slug': cls.group.slug}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_shared_between_feeds(self):
+        response = self.client.get(reverse('posts:main_page'))
+        self.assertTemplateUsed(response, 'posts/includes/post_card.html')
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'карточка 2')
+        self.assertTemplateNotUsed(
+            response, 'posts/includes/post_card.html'
+        )
+
+    def test_cards_fetched_in_one_round_trip(self):
+        posts = list(Post.objects.select_related('author', 'group'))
+        cards.render_cards(posts)
+        with mock.patch.object(cards.cache, 'get_many',
+                               wraps=cards.cache.get_many) as get_many:
+            with mock.patch.object(cards, 'render_stale') as render_stale:
+                rendered = cards.render_cards(posts)
+        self.assertEqual(get_many.call_count, 1)
+        render_stale.assert_not_called()
+        self.assertIn('карточка 0', rendered[self.posts[0].pk])
+
+    def test_card_follows_post_and_author(self):
+        self.client.get(self.group_url)
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.text = 'исправленная карточка'
+        post.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Новое'
+        author.save()
+        response = self.client.get(self.group_url)
+        self.assertContains(response, 'исправленная карточка')
+        self.assertContains(response, 'Новое Имя', count=3)
+        self.assertNotContains(response, 'Старое')
+
+
+@override_settings(COUNT_COMMENTS=3)
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='talker')
+        cls.post = Post.objects.create(text='обсуждаем', author=cls.author)
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'комментарий {i}')
+            for i in range(7)
+        ]
+
+    def test_post_detail_shows_first_batch(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertEqual(response.context['comments'], self.comments[:3])
+        self.assertTrue(response.context['comments_cursor'])
+
+    def test_fragment_returns_following_batches(self):
+        url = reverse('posts:comments', kwargs={'post_id': self.post.id})
+        loaded = []
+        cursor = ''
+        for _ in range(3):
+            with self.assertNumQueries(2):
+                response = self.client.get(url, {'cursor': cursor})
+            loaded += response.context['comments']
+            cursor = response.context['comments_cursor']
+        self.assertEqual(loaded, self.comments)
+        self.assertEqual(cursor, '')
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+
+    def test_bad_cursor_returns_first_batch(self):
+        """Испорченный курсор и курсор с огромным id — с начала."""
+        urls = (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:comments', kwargs={'post_id': self.post.id}),
+        )
+        cursors = ('broken', encode_position(NEXT, timezone.now(), 10 ** 30))
+        for url in urls:
+            for cursor in cursors:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.context['comments'],
+                                     self.comments[:3])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.reader = User.objects.create_user(username='etag_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag-group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='пост', author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+            reverse('posts:profile', kwargs={'username': 'etag_author'}),
+            reverse('posts:posts_list', kwargs={'slug': 'etag-group'}),
+        )
+
+    def assertNotModified(self, url, etag, modified=False):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        expected = HTTPStatus.OK if modified else HTTPStatus.NOT_MODIFIED
+        self.assertEqual(response.status_code, expected, url)
+        return response
+
+    def test_not_modified_without_rendering(self):
+        self.client.force_login(self.reader)
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            # Только сессия и пользователь: страница уже в кэше.
+            with self.assertNumQueries(2):
+                response = self.assertNotModified(url, etag)
+            self.assertEqual(response.content, b'')
+
+    def test_etag_depends_on_user_and_query(self):
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            self.assertNotModified(url + '?page=2', etag, modified=True)
+            self.client.force_login(self.reader)
+            self.assertNotModified(url, etag, modified=True)
+            self.client.logout()
+
+    def test_writes_change_etag(self):
+        writes = (
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='коммент'
+            ),
+            lambda: Post.objects.create(
+                text='ещё пост', author=self.author, group=self.group
+            ),
+            lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+            lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+        )
+        detail, profile, group = self.urls
+        changed_pages = ((detail,), (detail, profile, group), (profile,),
+                         (detail, profile, group))
+        for write, urls in zip(writes, changed_pages):
+            etags = {url: self.client.get(url)['ETag'] for url in urls}
+            write()
+            for url in urls:
+                self.assertNotModified(url, etags[url], modified=True)
+
+    def test_moving_post_changes_old_group(self):
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        self.post.group = None
+        self.post.save()
+        self.assertNotModified(url, etag, modified=True)
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cached_author')
+        cls.group = Group.objects.create(title='Кэш', slug='cached-group')
+        cls.post = Post.objects.create(
+            text='закэшированный пост', author=cls.author, group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            text='другой пост', author=cls.author
+        )
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_served_from_cache(self):
+        first = self.client.get(self.detail_url)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.detail_url)
+        self.assertEqual(second.content, first.content)
+        self.assertTemplateNotUsed(second, 'posts/post_detail.html')
+        etag = first['ETag']
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_query_string_is_part_of_key(self):
+        self.client.get(self.detail_url)
+        response = self.client.get(self.detail_url + '?cursor=broken')
+        self.assertTemplateUsed(response, 'posts/post_detail.html')
+
+    def test_personal_fragments_filled_per_user(self):
+        anonymous = self.client.get(self.detail_url)
+        self.assertNotContains(anonymous, 'редактировать запись')
+        self.assertNotContains(anonymous, 'csrfmiddlewaretoken')
+        self.assertNotContains(anonymous, '<!--hole:')
+        self.client.force_login(self.author)
+        response = self.client.get(self.detail_url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertContains(response, 'редактировать запись')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertContains(response, 'Пользователь: cached_author')
+        self.assertNotEqual(response['ETag'], anonymous['ETag'])
+
+    def test_follow_button_follows_viewer(self):
+        url = reverse('posts:profile', kwargs={'username': 'cached_author'})
+        reader = User.objects.create_user(username='cached_reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.get(url)
+        self.client.force_login(reader)
+        self.assertContains(self.client.get(url), 'Отписаться')
+        self.client.logout()
+        self.assertContains(self.client.get(url), 'Подписаться')
+
+    def test_writes_purge_only_affected_pages(self):
+        other_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.other_post.id}
+        )
+        group_url = reverse(
+            'posts:posts_list', kwargs={'slug': 'cached-group'}
+        )
+        for url in (self.detail_url, other_url, group_url):
+            self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='новый комментарий'
+        )
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, 'новый комментарий')
+        self.assertTemplateNotUsed(
+            self.client.get(other_url), 'posts/post_detail.html'
+        )
+        self.assertTemplateNotUsed(
+            self.client.get(group_url), 'posts/group_list.html'
+        )
+        Group.objects.filter(pk=self.group.pk).first().save()
+        self.assertTemplateUsed(
+            self.client.get(group_url), 'posts/group_list.html'
+        )
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='exporter')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Выгрузка', slug='export')
+        cls.post = Post.objects.create(
+            text='мой пост, "с кавычками"', author=cls.author,
+            group=cls.group,
+        )
+        Post.objects.create(text='чужой пост', author=cls.other)
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.other, text='комментарий'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_export_my_posts_jsonl(self):
+        response = self.client.get(reverse('posts:export_posts'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="exporter-posts.jsonl"',
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['text'], self.post.text)
+        self.assertEqual(row['author'], 'exporter')
+        self.assertEqual(row['group'], 'export')
+        self.assertEqual(row['pub_date'], self.post.pub_date.isoformat())
+
+    def test_export_my_posts_csv(self):
+        response = self.client.get(
+            reverse('posts:export_posts'), {'format': 'csv'}
+        )
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row['text'] for row in rows], [self.post.text])
+
+    def test_export_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('posts:export_posts'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command('export_content', 'comments', stdout=out)
+        row = json.loads(out.getvalue())
+        self.assertEqual(row['post'], self.post.pk)
+        self.assertEqual(row['author'], 'other')
+        out = StringIO()
+        call_command('export_content', 'posts', format='csv',
+                     chunk_size=1, stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 2)
@@ -0,0 +1,106 @@
+from functools import partial, wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from .cache import (get_cached_page, get_generations, page_etag,
+                    set_cached_page)
+from .fragments import fill_holes
+from .paginators import CursorPaginator
+
+
+def paginate(request, queryset, paginator_class=CursorPaginator, **kwargs):
+    """Отдаёт страницу ленты по курсору из GET, иначе по номеру."""
+    paginator = paginator_class(queryset, settings.COUNT_PAGES, **kwargs)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def page_generations(request, tags_func, *args, **kwargs):
+    # Поколения читаются один раз до view: и ETag, и сохранённая в кэше
+    # страница должны соответствовать данным на момент начала запроса.
+    if not hasattr(request, '_page_generations'):
+        tags = tags_func(request, *args, **kwargs)
+        request._page_generations = (
+            None if tags is None else get_generations(tags)
+        )
+    return request._page_generations
+
+
+def generations_etag(tags_func, request, *args, **kwargs):
+    generations = page_generations(request, tags_func, *args, **kwargs)
+    if generations is None:
+        return None
+    return page_etag(request, generations)
+
+
+def is_shared_page(request, response):
+    # Личные фрагменты в первом проходе не рисуются, поэтому CSRF-токен
+    # или cookie значат, что страница всё же у каждого посетителя своя.
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def fill_page(request, response):
+    content = response.content.decode(response.charset)
+    response.content = fill_holes(request, content)
+    return response
+
+
+def serve_cached_page(request, response, generations):
+    etag = quote_etag(page_etag(request, generations))
+    response['ETag'] = etag
+    response = get_conditional_response(request, etag=etag, response=response)
+    if response.status_code == 200:
+        fill_page(request, response)
+    return response
+
+
+def cached_page(tags_func):
+    """Кэш и условный GET для страниц, собранных из постов.
+
+    tags_func возвращает ключи поколений, от которых зависит страница,
+    или None, если объекта нет. Она должна быть дешёвой: по поколениям
+    строится ETag, и ответ 304 отдаётся до пагинатора и шаблона.
+
+    Страница рендерится в два прохода: общая для всех пользователей
+    часть с метками {% hole %} кэшируется, пока сигналы не сменят ни
+    одно из её поколений, а личные фрагменты дорисовываются на каждый
+    запрос (posts.fragments).
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=partial(generations_etag, tags_func)
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                cached = get_cached_page(request)
+                if cached is not None:
+                    return serve_cached_page(request, *cached)
+            request.punch_holes = True
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if is_shared_page(request, response):
+                generations = page_generations(
+                    request, tags_func, *args, **kwargs
+                )
+                if generations is not None:
+                    set_cached_page(request, response, generations)
+            return fill_page(request, response)
+
+        wrapper = vary_on_cookie(wrapper)
+        return cache_control(private=True, no_cache=True)(wrapper)
+    return decorator
@@ -1,29 +1,75 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import export, thumbnails
+from .cache import (INDEX_GENERATION_KEY, NAMES_GENERATION_KEY,
+                    index_generation, object_generation_key)
 from .forms import CommentForm, GroupForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginators import (CachedCountPaginator, FeedPaginator,
+                         get_comments_batch)
+from .search import search_posts
+from .utils import cached_page, paginate
 
+DETAIL_GEOMETRY = '1280x720'
 
+
+def index_tags(request):
+    return [INDEX_GENERATION_KEY, NAMES_GENERATION_KEY]
+
+
+def group_show_tags(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [object_generation_key('group', group_id), NAMES_GENERATION_KEY]
+
+
+def profile_tags(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [object_generation_key('author', author_id), NAMES_GENERATION_KEY]
+
+
+def post_detail_tags(request, post_id):
+    author_id = Post.objects.filter(id=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [
+        object_generation_key('post', post_id),
+        object_generation_key('author', author_id),
+        NAMES_GENERATION_KEY,
+    ]
+
+
+@cached_page(index_tags)
 def index(request):
-    post_list = Post.objects.all().order_by('-pub_date')
-    paginator = Paginator(post_list, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request, Post.objects.select_related('author', 'group')
+    )
     context = {
         'page_obj': page_obj,
+        'cache_timeout': settings.INDEX_PAGE_CACHE_TIMEOUT,
+        'cache_generation': index_generation(),
     }
     return render(request, 'posts/index.html', context)
 
 
+@cached_page(group_show_tags)
 def group_show(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.order_by('-pub_date')
-    paginator = Paginator(posts, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request, group.posts.select_related('author', 'group')
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -31,39 +77,73 @@ def group_show(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@cached_page(profile_tags)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    post_list = user.posts.order_by('-pub_date').all()
-    paginator = Paginator(post_list, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user,
-            author=user,
-        ).exists()
-    else:
-        following = None
+    user = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    page_obj = paginate(
+        request, user.posts.select_related('author', 'group')
+    )
     context = {
         'page_obj': page_obj,
         'author': user,
-        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@cached_page(post_detail_tags)
 def post_detail(request, post_id):
-    user_post = get_object_or_404(Post, id=post_id)
+    user_post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    user_post.thumbnail_url = thumbnails.resolve_urls(
+        [user_post], DETAIL_GEOMETRY
+    ).get(user_post.pk)
     form = CommentForm()
-    comments = user_post.comments.all()
+    comments, comments_cursor = get_comments_batch(
+        user_post.comments.all(), request.GET.get('cursor'),
+        settings.COUNT_COMMENTS
+    )
     context = {
         'post': user_post,
         'form': form,
-        'comments': comments
+        'comments': comments,
+        'comments_cursor': comments_cursor,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_fragment(request, post_id):
+    post = get_object_or_404(Post, id=post_id)
+    comments, comments_cursor = get_comments_batch(
+        post.comments.all(), request.GET.get('cursor'),
+        settings.COUNT_COMMENTS
+    )
+    context = {
+        'post': post,
+        'comments': comments,
+        'comments_cursor': comments_cursor,
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        posts = search_posts(
+            Post.objects.select_related('author', 'group'), query
+        )
+        paginator = CachedCountPaginator(posts, settings.COUNT_PAGES)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -71,6 +151,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.enqueue(post.image.name)
         return redirect('posts:profile', username=request.user.username)
     context = {
         'form': form,
@@ -101,6 +182,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post.image.name)
         return redirect('posts:post_detail', post_id=post.id)
     context = {
         'form': form,
@@ -124,11 +207,9 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = (Post.objects.filter(author__following__user=request.user).
-                 order_by('-pub_date'))
-    paginator = Paginator(post_list, settings.COUNT_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(
+        request, request.user.feed_entries.all(), FeedPaginator
+    )
     context = {'page_obj': page_obj}
 
     return render(request, 'posts/follow.html', context)
@@ -149,3 +230,20 @@ def profile_unfollow(request, username):
     Follow.objects.filter(user=request.user, author=followed_author).delete()
 
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def export_posts(request):
+    file_format = request.GET.get('format')
+    if file_format not in export.WRITERS:
+        file_format = 'jsonl'
+    lines = export.export_lines(
+        request.user.posts.all(), export.POST_FIELDS, file_format
+    )
+    response = StreamingHttpResponse(
+        lines, content_type=export.CONTENT_TYPES[file_format]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{request.user.username}-posts.{file_format}"'
+    )
+    return response
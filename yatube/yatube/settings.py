@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -45,11 +46,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.queries.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -136,13 +139,102 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 COUNT_PAGES = 10
 
+COUNT_COMMENTS = 20
+
+# Число объектов для пагинатора кэшируется до первой записи в посты,
+# а больше PAGINATOR_MAX_COUNT строк не считается вовсе.
+PAGINATOR_COUNT_CACHE_TIMEOUT = 60 * 60
+PAGINATOR_MAX_COUNT = 10000
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры картинок постов создаются сразу после загрузки в пуле из
+# POST_THUMBNAIL_WORKERS процессов (0 — синхронно). Геометрии и опции
+# должны включать те, что показывают карточки и страница поста; пока
+# миниатюры нет, выводится исходная картинка. В тестах миниатюры
+# создаются синхронно, см. core.testing.
+POST_THUMBNAIL_WORKERS = 2
+POST_THUMBNAIL_GEOMETRIES = (
+    ('500', {}),
+    ('1280x720', {}),
+)
+
+# Кэш в файле SQLite общий для всех воркеров сервера: фрагменты и
+# страницы не дублируются по процессам, а смена поколения видна всем.
+# Перед ним стоит небольшой LRU в памяти процесса (core.cache.tiered),
+# чтобы самые горячие ключи не читать и не распаковывать на каждый запрос.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.tiered.TieredCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'L1_TIMEOUT': 5,
+            'L1_MAX_ENTRIES': 1000,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_BYTES': 256 * 1024 * 1024,
+        },
+    },
+}
+
+# Защита от одновременного пересчёта (core.cache.stampede): сколько
+# ждать пересчёта в другом запросе и сколько ещё отдавать устаревшее
+# значение, пока его пересчитывают.
+CACHE_LOCK_TIMEOUT = 10
+CACHE_STALE_TIMEOUT = 60
+
+# Фрагмент index_page сбрасывается сигналами при изменении постов, групп
+# и пользователей, поэтому его можно держать в кэше долго.
+INDEX_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Карточка поста одна для всех лент (posts.cards); версия карточки —
+# поколения поста и имён, поэтому срок хранения можно не ограничивать
+# коротким.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Страницы для анонимных пользователей кэшируются целиком; устаревшая
+# копия отбрасывается, как только сигналы сменят поколение поста, автора
+# или группы, из которых она собрана.
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Подсчёт запросов к базе и поиск N+1 (core.middleware.queries). Бюджеты
+# задаются по имени view и учитывают один запрос к thumbnail_kvstore при
+# холодном кэше; в тестах превышение бюджета — ошибка (core.testing).
+# API групп, профилей и поста тратит ещё запрос на поиск объекта для
+# ETag: им же ограничивается ответ 304.
+QUERY_BUDGET_ENABLED = DEBUG
+QUERY_BUDGET_RAISE = False
+QUERY_REPEAT_THRESHOLD = 3
+QUERY_BUDGETS = {
+    'posts:main_page': 5,
+    'posts:posts_list': 7,
+    'posts:profile': 8,
+    'posts:post_detail': 6,
+    'posts:follow_index': 5,
+    'posts:comments': 4,
+    'posts:search': 4,
+    'api:posts': 1,
+    'api:group_posts': 3,
+    'api:profile_posts': 3,
+    'api:follow_posts': 3,
+    'api:post_detail': 2,
 }
 
+# Профилирование отдельных запросов (core.middleware.profiling):
+# включается заголовком X-Profile с токеном из make_token() или
+# параметром ?profile для сотрудников.
+PROFILING_ENABLED = True
+PROFILING_QUERY_PARAM = 'profile'
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_DUMP_APPS = ('posts',)
+PROFILING_DUMP_DIR = None
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+TEST_RUNNER = 'core.testing.TestRunner'